@@ -49,6 +49,16 @@ MIDDLEWARE = [
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
 
+# Per-request SQL instrumentation (query count and time in Server-Timing
+# header, slow requests logged), enable by setting SQL_TIMING = True
+# in settings_local.py. Requests taking at least SQL_TIMING_THRESHOLD_MS
+# milliseconds are logged.
+SQL_TIMING = globals().get('SQL_TIMING', False)
+SQL_TIMING_THRESHOLD_MS = globals().get('SQL_TIMING_THRESHOLD_MS', 500)
+if SQL_TIMING:
+    # first, so queries of other middlewares are measured as well
+    MIDDLEWARE.insert(0, 'records.middleware.SQLTimingMiddleware')
+
 ROOT_URLCONF = 'eregister.urls'
 
 TEMPLATES = [
@@ -91,6 +101,50 @@ AUTH_PASSWORD_VALIDATORS = [
 ]
 
 
+# Cache
+# https://docs.djangoproject.com/en/3.2/topics/cache/
+# Backend can be selected by setting CACHE_BACKEND in settings_local.py
+# to 'locmem' (default), 'file' or 'db' (run 'createcachetable' first).
+# 'locmem' is separate for every process, so use shared backend when
+# running more processes or warming dashboards with 'warmdashboards'.
+
+CACHE_BACKENDS = {
+    'locmem': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'eregister',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+    'file': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+    'db': {
+        'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+        'LOCATION': 'eregister_cache',
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+}
+
+CACHES = {
+    'default': CACHE_BACKENDS[globals().get('CACHE_BACKEND', 'locmem')],
+}
+
+# Seconds for which timetables are cached. Timetables are invalidated
+# when related Schedule, Lesson or Period is saved.
+TIMETABLE_CACHE_TIMEOUT = 60 * 60
+
+# Number of processes hashing passwords of students imported in web view
+# (see records.utils.student_import.make_passwords)
+STUDENT_IMPORT_WORKERS = globals().get('STUDENT_IMPORT_WORKERS', 2)
+
+
 # Internationalization
 # https://docs.djangoproject.com/en/3.2/topics/i18n/
 
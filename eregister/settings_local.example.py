@@ -13,3 +13,10 @@ DATABASES = {
         'NAME': BASE_DIR / 'db.sqlite3',
     }
 }
+
+# Cache backend: 'locmem' (default), 'file' or 'db'
+# CACHE_BACKEND = 'locmem'
+
+# Log slow requests and add SQL timing to Server-Timing response header
+# SQL_TIMING = True
+# SQL_TIMING_THRESHOLD_MS = 500
@@ -26,5 +26,6 @@ urlpatterns = [
     path('auth/', include('records.urls.auth')),
     path('schedule/', include('records.urls.schedule')),
     path('ajax/', include('records.urls.ajax')),
+    path('export/', include('records.urls.export')),
     path('admin/', admin.site.urls),
 ]
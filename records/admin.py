@@ -1,10 +1,19 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from django.contrib.admin.views.main import ChangeList
 from records.models import *
+from records.utils.user import prefetch_current_assignments
 from django.utils.translation import gettext_lazy as _
 # Register your models here.
 
 
+class UserChangeList(ChangeList):
+    def get_results(self, request):
+        """ Resolve current groups of listed users with one query """
+        super().get_results(request)
+        prefetch_current_assignments(self.result_list)
+
+
 class CustomUserAdmin(UserAdmin):
     # Add additional is_teacher field to user edit form in admin
     fieldsets = (
@@ -29,8 +38,12 @@ class CustomUserAdmin(UserAdmin):
     list_display = UserAdmin.list_display + \
         ('is_teacher', 'is_educator', 'student_group')
     list_filter = UserAdmin.list_filter + ('is_teacher',)
+    list_select_related = ('educated_group',)
     ordering = ('last_name',)
 
+    def get_changelist(self, request, **kwargs):
+        return UserChangeList
+
 
 class StudentGroupAdmin(admin.ModelAdmin):
     list_display = ('name', 'educator')
@@ -80,6 +93,12 @@ class MarkAdmin(admin.ModelAdmin):
     list_display = ('symbol', 'student', 'course', 'date_created')
 
 
+class MarkAggregateAdmin(admin.ModelAdmin):
+    list_display = ('student', 'course', 'count', 'mean')
+    search_fields = ('student__first_name', 'student__last_name',
+                     'course__name')
+
+
 admin.site.register(User, CustomUserAdmin)
 admin.site.register(StudentGroup, StudentGroupAdmin)
 admin.site.register(StudentGroupAssignment, StudentGroupAssignmentAdmin)
@@ -91,3 +110,4 @@ admin.site.register(Attendance)
 admin.site.register(Category)
 admin.site.register(Symbol, SymbolAdmin)
 admin.site.register(Mark, MarkAdmin)
+admin.site.register(MarkAggregate, MarkAggregateAdmin)
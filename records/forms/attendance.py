@@ -1,5 +1,11 @@
-from django.forms import modelformset_factory, ModelForm, RadioSelect
+from django import forms
+from django.core.exceptions import ValidationError
+from django.forms import (
+    modelformset_factory, BaseModelFormSet, ModelForm, RadioSelect
+)
+from django.utils.translation import gettext_lazy as _
 from records.models import Attendance
+from records.utils.attendance import save_attendances
 
 
 class AttendanceForm(ModelForm):
@@ -11,8 +17,57 @@ class AttendanceForm(ModelForm):
         }
 
 
+class BaseAttendanceFormSet(BaseModelFormSet):
+    """
+    Formset of existing Attendances. Only status can be changed, so
+    changed attendances are saved with one bulk UPDATE query instead of
+    query per form.
+    """
+
+    def add_fields(self, form, index):
+        """ Accept only ids of attendances from formset's queryset """
+        super().add_fields(form, index)
+        form.fields[self.model._meta.pk.name].queryset = self.queryset
+
+    def save(self, commit=True):
+        # forms with ids not found in formset's queryset (e.g. other
+        # lesson's attendances) get new instances - they are skipped
+        changed = [form.instance for form in self.initial_forms
+                   if form.instance.pk is not None and form.has_changed()]
+        if commit:
+            save_attendances(changed)
+        return changed
+
+
 AttendanceFormSet = modelformset_factory(
     Attendance,
     form=AttendanceForm,
+    formset=BaseAttendanceFormSet,
     extra=0,
 )
+
+
+class DateRangeForm(forms.Form):
+    """ Optional range of dates, used to filter course's register """
+    date_from = forms.DateField(
+        label=_('From'),
+        required=False
+    )
+
+    date_to = forms.DateField(
+        label=_('To'),
+        required=False
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+
+        d_from = cleaned_data.get('date_from')
+        d_to = cleaned_data.get('date_to')
+        if d_from and d_to and d_to < d_from:
+            raise ValidationError({
+                'date_to': _(
+                    "End date can't be earlier than start date."
+                )
+            })
+        return cleaned_data
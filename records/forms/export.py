@@ -0,0 +1,47 @@
+from django import forms
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext_lazy as _
+from records.models import StudentGroup, Course
+from records.utils.export import EXPORT_FORMATS
+
+
+class ExportFilterForm(forms.Form):
+    """ Used for filtering exported marks, attendance and lessons """
+    format = forms.ChoiceField(
+        choices=[(name, name) for name in EXPORT_FORMATS],
+        initial='csv',
+        required=False
+    )
+
+    group = forms.ModelChoiceField(
+        queryset=StudentGroup.objects,
+        required=False
+    )
+
+    course = forms.ModelChoiceField(
+        queryset=Course.objects,
+        required=False
+    )
+
+    date_from = forms.DateField(
+        label=_('From'),
+        required=False
+    )
+
+    date_to = forms.DateField(
+        label=_('To'),
+        required=False
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+
+        d_from = cleaned_data.get('date_from')
+        d_to = cleaned_data.get('date_to')
+        if d_from and d_to and d_to < d_from:
+            raise ValidationError({
+                'date_to': _(
+                    "End date can't be earlier than start date."
+                )
+            })
+        return cleaned_data
@@ -4,7 +4,9 @@ from django.db.models import Q
 from django.contrib.auth import get_user_model
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
+from django.urls import reverse_lazy
 from records.utils.user import get_students_without_group
+from records.forms.widgets import AjaxSelectMultiple
 from records.models import StudentGroup
 from datetime import date
 
@@ -63,6 +65,11 @@ class AssignManyToGroupForm(forms.Form):
             "can be edited from their profile."
         ),
         required=True,
+        # options are searched on demand instead of rendering all students
+        widget=AjaxSelectMultiple(
+            url=reverse_lazy('ajax:student-search'),
+            params={'without_group': 1}
+        ),
     )
 
     date_start = forms.DateField(
@@ -75,6 +82,12 @@ class AssignManyToGroupForm(forms.Form):
         required=True,
     )
 
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        # queryset depends on current date, build it for every form
+        self.fields['students_to_add'].queryset = \
+            get_students_without_group()
+
     def clean(self):
         cleaned_data = super().clean()
 
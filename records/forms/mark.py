@@ -3,10 +3,24 @@ from django import forms
 
 
 class MarkUpdateForm(forms.ModelForm):
+    """
+    Form to change Mark's symbol. Hidden 'date_modified' holds
+    modification date of the displayed mark, so concurrent change
+    can be detected on save.
+    """
     class Meta:
         model = Mark
         fields = ['symbol']
 
+    date_modified = forms.DateTimeField(
+        required=False,
+        widget=forms.HiddenInput()
+    )
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['date_modified'].initial = self.instance.date_modified
+
 
 class MarkCreateForm(forms.ModelForm):
     """
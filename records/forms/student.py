@@ -1,7 +1,14 @@
 from django import forms
 from django.contrib.auth import get_user_model
 from django.db.models import fields
+from django.core.exceptions import ValidationError
+from django.utils.translation import gettext_lazy as _
 from records.models import StudentGroupAssignment
+from records.utils.student_import import (
+    StudentImportError, parse_students_csv
+)
+import csv
+import io
 
 User = get_user_model()
 
@@ -21,6 +28,46 @@ class StudentCreateForm(forms.ModelForm):
         }
 
 
+class StudentImportForm(forms.Form):
+    """
+    Upload of CSV file with students. Rows are parsed during validation,
+    results are stored in 'students' and 'row_errors' attributes.
+    """
+    file = forms.FileField(
+        label=_('CSV file'),
+        help_text=_(
+            'UTF-8, with header row: last_name, first_name and optionally '
+            'birth_date (YYYY-MM-DD), email, address, zip_code, city, phone.'
+        )
+    )
+    skip_invalid = forms.BooleanField(
+        label=_('Skip invalid rows'),
+        required=False
+    )
+
+    def clean_file(self):
+        file = self.cleaned_data['file']
+        try:
+            text = io.StringIO(file.read().decode('utf-8-sig'), newline='')
+            self.students, self.row_errors = parse_students_csv(text)
+        except (UnicodeDecodeError, csv.Error) as error:
+            raise ValidationError(_('Invalid CSV file: %s') % error)
+        except StudentImportError as error:
+            raise ValidationError(str(error))
+        return file
+
+    def clean(self):
+        cleaned_data = super().clean()
+        row_errors = getattr(self, 'row_errors', None)
+        if row_errors and not cleaned_data.get('skip_invalid'):
+            for line, error in row_errors.items():
+                self.add_error(None, _('Line %(line)i: %(errors)s') % {
+                    'line': line,
+                    'errors': ' '.join(error.messages),
+                })
+        return cleaned_data
+
+
 class AssignToGroupForm(forms.ModelForm):
     student = forms.ModelChoiceField(
         queryset=User.objects,
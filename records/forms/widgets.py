@@ -0,0 +1,37 @@
+from django import forms
+from django.utils.http import urlencode
+
+
+class AjaxSelectMultiple(forms.SelectMultiple):
+    """
+    SelectMultiple for ModelMultipleChoiceField rendering only selected
+    options, instead of whole queryset. Other options are loaded on
+    demand by select2 from 'url' (see views.ajax.student for response
+    format), optionally with additional GET 'params'.
+    """
+
+    def __init__(self, url, params=None, attrs=None):
+        super().__init__(attrs)
+        self.url = url
+        self.params = params or {}
+
+    def build_attrs(self, base_attrs, extra_attrs=None):
+        attrs = super().build_attrs(base_attrs, extra_attrs)
+        url = str(self.url)
+        if self.params:
+            url = '%s?%s' % (url, urlencode(self.params))
+        attrs['data-ajax--url'] = url
+        attrs['data-ajax--delay'] = 250
+        return attrs
+
+    def optgroups(self, name, value, attrs=None):
+        selected = [v for v in value if str(v).isdigit()]
+        choices = []
+        if selected:
+            queryset = self.choices.queryset.filter(pk__in=selected)
+            choices = [self.choices.choice(obj) for obj in queryset]
+        all_choices, self.choices = self.choices, choices
+        try:
+            return super().optgroups(name, value, attrs)
+        finally:
+            self.choices = all_choices
@@ -0,0 +1,164 @@
+from django.core.cache import cache
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from records.models import StudentGroup, StudentGroupAssignment, User
+from records.utils.user import get_students_without_group
+import datetime
+import random
+import time
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed group assignments and measure date range lookups with "
+        "and without composite indexes (query plans are printed with "
+        "verbosity 2). Indexes are dropped and recreated and seeded rows "
+        "are deleted afterwards - use scratch database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--assignments', type=int, default=100000,
+            help='Number of seeded assignments.'
+        )
+        parser.add_argument(
+            '--groups', type=int, default=100,
+            help='Number of seeded student groups.'
+        )
+        parser.add_argument(
+            '--repeat', type=int, default=50,
+            help='Number of lookups per measured code path.'
+        )
+        parser.add_argument(
+            '--seed', type=int, default=0,
+            help='Random seed.'
+        )
+
+    def seed(self, options):
+        """ Seed students with consecutive yearly assignments """
+        rand = random.Random(options['seed'])
+        per_student = 5
+        User.objects.bulk_create([
+            User(username='benchmark.educator.%i' % i, first_name='Educator',
+                 last_name=str(i), is_teacher=True)
+            for i in range(options['groups'])
+        ])
+        educators = User.objects.filter(
+            username__startswith='benchmark.educator.')
+        StudentGroup.objects.bulk_create([
+            StudentGroup(name='benchmark %i' % i, educator=educator)
+            for i, educator in enumerate(educators)
+        ])
+        groups = list(StudentGroup.objects.filter(
+            name__startswith='benchmark '))
+        User.objects.bulk_create([
+            User(username='benchmark.student.%i' % i, first_name='Student',
+                 last_name=str(i))
+            for i in range(options['assignments'] // per_student)
+        ], batch_size=1000)
+        students = User.objects\
+            .filter(username__startswith='benchmark.student.')\
+            .values_list('pk', flat=True)
+
+        today = datetime.date.today()
+        assignments = []
+        for student in students:
+            start = today - datetime.timedelta(days=365 * per_student // 2)
+            start += datetime.timedelta(days=rand.randrange(365))
+            for _ in range(per_student):
+                end = start + datetime.timedelta(days=300)
+                assignments.append(StudentGroupAssignment(
+                    student_id=student, group=rand.choice(groups),
+                    date_start=start, date_end=end
+                ))
+                start = end + datetime.timedelta(days=1)
+        StudentGroupAssignment.objects.bulk_create(
+            assignments, batch_size=1000)
+        return groups, list(students), len(assignments)
+
+    def get_lookups(self, groups, students, options):
+        """ Return dict {name: (callable, queryset to explain)} """
+        rand = random.Random(options['seed'])
+        today = datetime.date.today()
+        sample_groups = [rand.choice(groups) for _ in range(options['repeat'])]
+        sample_students = User.objects.in_bulk(
+            rand.sample(students, options['repeat'])).values()
+        assignment = StudentGroupAssignment(
+            student=next(iter(sample_students)),
+            date_start=today, date_end=today + datetime.timedelta(days=30)
+        )
+        return {
+            'StudentGroup.get_assignments_by_date': (
+                lambda: [list(group.get_assignments_by_date(today))
+                         for group in sample_groups],
+                sample_groups[0].get_assignments_by_date(today)
+            ),
+            # query of User.get_current_assignment(), which is cached
+            # on instance and in cache after the first run
+            'User.get_current_assignment (query)': (
+                lambda: [student.assignments
+                         .filter(date_start__lte=today, date_end__gte=today)
+                         .select_related('group')
+                         .first()
+                         for student in sample_students],
+                assignment.student.assignments.filter(
+                    date_start__lte=today, date_end__gte=today)
+            ),
+            'get_students_without_group': (
+                lambda: get_students_without_group().count(),
+                get_students_without_group()
+            ),
+            'StudentGroupAssignment._get_colliding_assignments': (
+                lambda: [list(assignment._get_colliding_assignments())
+                         for _ in range(options['repeat'])],
+                assignment._get_colliding_assignments()
+            ),
+        }
+
+    def measure(self, lookups):
+        for name, (lookup, qs) in lookups.items():
+            # nothing cached by previous run is reused
+            cache.clear()
+            start = time.perf_counter()
+            lookup()
+            elapsed = time.perf_counter() - start
+            self.stdout.write('  %-50s %8.1f ms' % (name, elapsed * 1000))
+            if self.verbosity > 1:
+                self.stdout.write(qs.explain())
+
+    def cleanup(self):
+        StudentGroupAssignment.objects\
+            .filter(group__name__startswith='benchmark ')\
+            .delete()
+        StudentGroup.objects.filter(name__startswith='benchmark ').delete()
+        User.objects.filter(username__startswith='benchmark.').delete()
+
+    def handle(self, *args, **options):
+        self.verbosity = options['verbosity']
+        indexes = StudentGroupAssignment._meta.indexes
+        start = time.perf_counter()
+        with transaction.atomic():
+            groups, students, count = self.seed(options)
+        self.stdout.write('Seeded %i assignments in %.2fs.' % (
+            count, time.perf_counter() - start))
+
+        removed = False
+        try:
+            lookups = self.get_lookups(groups, students, options)
+            self.stdout.write('With composite indexes:')
+            self.measure(lookups)
+
+            with connection.schema_editor() as editor:
+                for index in indexes:
+                    editor.remove_index(StudentGroupAssignment, index)
+            removed = True
+            # reconnect, so no statement prepared with old schema is reused
+            connection.close()
+            self.stdout.write('Without composite indexes:')
+            self.measure(lookups)
+        finally:
+            if removed:
+                with connection.schema_editor() as editor:
+                    for index in indexes:
+                        editor.add_index(StudentGroupAssignment, index)
+            self.cleanup()
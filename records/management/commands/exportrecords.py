@@ -0,0 +1,72 @@
+from django.core.management.base import BaseCommand, CommandError
+from records.utils.export import (
+    EXPORTS, EXPORT_FORMATS, get_export_queryset
+)
+import datetime
+
+
+def date_arg(value):
+    return datetime.date.fromisoformat(value)
+
+
+class Command(BaseCommand):
+    help = (
+        "Export marks, attendance or lessons as CSV or JSON lines. "
+        "Rows are streamed in chunks, so memory usage stays flat "
+        "regardless of number of rows."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('name', choices=list(EXPORTS))
+        parser.add_argument(
+            '--format', choices=list(EXPORT_FORMATS), default='csv',
+            help='Output format, CSV by default.'
+        )
+        parser.add_argument(
+            '--output',
+            help='Path of output file. Written to stdout by default.'
+        )
+        parser.add_argument('--group', type=int, help='StudentGroup pk.')
+        parser.add_argument('--course', type=int, help='Course pk.')
+        parser.add_argument(
+            '--date-from', type=date_arg,
+            help='First date of exported range (YYYY-MM-DD).'
+        )
+        parser.add_argument(
+            '--date-to', type=date_arg,
+            help='Last date of exported range (YYYY-MM-DD).'
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=2000,
+            help='Number of rows fetched from database at once.'
+        )
+
+    def handle(self, *args, **options):
+        date_from, date_to = options['date_from'], options['date_to']
+        if date_from and date_to and date_to < date_from:
+            raise CommandError("End date can't be earlier than start date.")
+
+        name = options['name']
+        queryset = get_export_queryset(
+            name,
+            group=options['group'],
+            course=options['course'],
+            date_from=date_from,
+            date_to=date_to,
+        )
+        iter_rows, _ = EXPORT_FORMATS[options['format']]
+        lines = iter_rows(name, queryset, chunk_size=options['chunk_size'])
+
+        if not options['output']:
+            for line in lines:
+                self.stdout.write(line, ending='')
+            return
+
+        count = -1 if options['format'] == 'csv' else 0
+        with open(options['output'], 'w', encoding='utf-8',
+                  newline='') as file:
+            for line in lines:
+                file.write(line)
+                count += 1
+        self.stderr.write('%i rows exported to %s.' % (
+            count, options['output']))
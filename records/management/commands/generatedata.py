@@ -0,0 +1,417 @@
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils.text import slugify
+from faker import Faker
+from itertools import islice
+from records.models import (
+    User, StudentGroup, StudentGroupAssignment, Course, Period, Schedule,
+    Lesson, Attendance, Category, Symbol, Mark, ChangeHistory, MarkAggregate
+)
+from records.utils.attendance import repair_attendance_counts
+from records.utils.schedule import bulk_create_schedules
+import datetime
+import random
+import string
+import time
+
+PRESETS = {
+    'small': {
+        'groups': 5, 'teachers': 15, 'students': 100,
+        'weeks': 4, 'marks': 3,
+    },
+    'medium': {
+        'groups': 20, 'teachers': 60, 'students': 600,
+        'weeks': 20, 'marks': 6,
+    },
+    'large': {
+        'groups': 50, 'teachers': 150, 'students': 2000,
+        'weeks': 40, 'marks': 10,
+    },
+}
+
+COURSES = [
+    'Mathematics', 'English', 'History', 'Biology', 'Chemistry',
+    'Physics', 'Geography', 'Physical education',
+]
+CATEGORIES = [('Test', 3), ('Quiz', 2), ('Homework', 1), ('Activity', 1)]
+SYMBOLS = [('1', 1), ('2', 2), ('3', 3), ('4', 4), ('5', 5), ('6', 6)]
+PERIODS_PER_DAY = 8
+LESSONS_PER_DAY = 5
+
+
+def date_type(value):
+    return datetime.date.fromisoformat(value)
+
+
+def get_term_start():
+    """ Return 1st September of current school year """
+    today = datetime.date.today()
+    year = today.year if today.month >= 9 else today.year - 1
+    return datetime.date(year, 9, 1)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate synthetic data: teachers, groups with educators, "
+        "students with assignments, courses, schedule with lessons, "
+        "attendance of past lessons and marks. Objects are created with "
+        "bulk inserts in dependency order, in one transaction. "
+        "Use --seed for reproducible data."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--preset', choices=list(PRESETS), default='small',
+            help='Size of generated data set, small by default.'
+        )
+        parser.add_argument('--seed', type=int, help='Random seed.')
+        parser.add_argument(
+            '--groups', type=int, help='Number of groups (overrides preset).'
+        )
+        parser.add_argument(
+            '--teachers', type=int,
+            help='Number of teachers (overrides preset).'
+        )
+        parser.add_argument(
+            '--students', type=int,
+            help='Number of students (overrides preset).'
+        )
+        parser.add_argument(
+            '--weeks', type=int,
+            help='Length of the term in weeks (overrides preset).'
+        )
+        parser.add_argument(
+            '--marks', type=int,
+            help='Marks per student in every course (overrides preset).'
+        )
+        parser.add_argument(
+            '--date-start', type=date_type, default=get_term_start(),
+            help='First day of the term (YYYY-MM-DD), 1st September '
+                 'of current school year by default.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of rows inserted per query.'
+        )
+
+    def report(self, label, count, start):
+        elapsed = time.perf_counter() - start
+        self.stdout.write('%-14s %8i in %6.2fs (%.0f rows/s)' % (
+            label + ':', count, elapsed, count / elapsed if elapsed else 0))
+
+    def get_username(self, first_name):
+        # same format as generated by generate_username signal handler
+        suffix = ''.join(self.random.choices('0123456789abcdef', k=8))
+        return '%s.%s' % (slugify(first_name), suffix)
+
+    def create_users(self, count, is_teacher):
+        """ Bulk create users, return list of them with pks loaded """
+        users = []
+        password = make_password(None)
+        for _ in range(count):
+            first_name = self.fake.first_name()
+            users.append(User(
+                username=self.get_username(first_name),
+                password=password,
+                first_name=first_name,
+                last_name=self.fake.last_name(),
+                is_teacher=is_teacher,
+                birth_date=self.fake.date_of_birth(
+                    minimum_age=25 if is_teacher else 7,
+                    maximum_age=65 if is_teacher else 15),
+                address=self.fake.street_address(),
+                zip_code=self.fake.postcode(),
+                city=self.fake.city(),
+                phone=self.fake.msisdn(),
+                email=self.fake.email(),
+            ))
+            users[-1].set_search_names()
+        User.objects.bulk_create(users, batch_size=self.batch_size)
+        pks = User.objects\
+            .filter(username__in=[user.username for user in users])\
+            .values_list('username', 'pk')
+        pks = dict(pks)
+        for user in users:
+            user.pk = pks[user.username]
+        return users
+
+    def create_groups(self, teachers, count):
+        existing = set(StudentGroup.objects.values_list('name', flat=True))
+        names = (
+            '%i%s' % (grade, letter)
+            for letter in string.ascii_uppercase
+            for grade in range(1, 9)
+        )
+        names = [name for name in names if name not in existing][:count]
+        if len(names) < count:
+            raise CommandError('Not enough free group names.')
+        groups = [
+            StudentGroup(name=name, educator=teacher)
+            for name, teacher in zip(sorted(names), teachers)
+        ]
+        StudentGroup.objects.bulk_create(groups)
+        pks = dict(StudentGroup.objects
+                   .filter(name__in=names)
+                   .values_list('name', 'pk'))
+        for group in groups:
+            group.pk = pks[group.name]
+        return groups
+
+    def get_periods(self):
+        """ Return periods used for lessons, create default ones if none """
+        if not Period.objects.exists():
+            # 45 minutes long, with 10 minutes breaks, from 8:00
+            start = datetime.datetime(2000, 1, 1, 8, 0)
+            minute = datetime.timedelta(minutes=1)
+            Period.objects.bulk_create([
+                Period(
+                    time_start=(start + 55 * i * minute).time(),
+                    time_end=(start + (55 * i + 45) * minute).time(),
+                ) for i in range(PERIODS_PER_DAY)
+            ])
+        return list(Period.objects.all())
+
+    def get_schedules(self, groups, courses, teachers, periods, date_start,
+                      date_end):
+        """
+        Build unsaved Schedule entries - LESSONS_PER_DAY lessons a day
+        for every group, spread over group's courses. Every course has
+        one teacher, entries are placed in slots where both group and
+        teacher are free, so they never collide.
+        """
+        slots = [
+            (day, period)
+            for day in range(5)
+            for period in periods[:LESSONS_PER_DAY]
+        ]
+        teacher_load = {teacher.pk: 0 for teacher in teachers}
+        teacher_busy = {teacher.pk: set() for teacher in teachers}
+        teachers_by_pk = {teacher.pk: teacher for teacher in teachers}
+        schedules = []
+        for group in groups:
+            group_courses = courses[group.pk]
+            sessions = [
+                group_courses[i % len(group_courses)]
+                for i in range(len(slots))
+            ]
+            course_teachers = {}
+            free_slots = list(slots)
+            self.random.shuffle(free_slots)
+            for course in sessions:
+                if course.pk not in course_teachers:
+                    # least loaded teacher, ties broken randomly
+                    course_teachers[course.pk] = min(
+                        teacher_load,
+                        key=lambda pk: (teacher_load[pk], self.random.random())
+                    )
+                # if course's teacher is busy in all free slots,
+                # session is given to the least loaded available teacher
+                candidates = [course_teachers[course.pk]] + sorted(
+                    teacher_load, key=teacher_load.get)
+                teacher_pk, slot = next((
+                    (teacher_pk, slot)
+                    for teacher_pk in candidates
+                    for slot in free_slots
+                    if slot not in teacher_busy[teacher_pk]
+                ), (None, None))
+                if slot is None:
+                    continue
+                free_slots.remove(slot)
+                teacher_busy[teacher_pk].add(slot)
+                teacher_load[teacher_pk] += 1
+                day, period = slot
+                first_date = date_start + datetime.timedelta(
+                    days=(day - date_start.weekday()) % 7)
+                schedules.append(Schedule(
+                    course=course,
+                    teacher=teachers_by_pk[teacher_pk],
+                    period=period,
+                    date_start=first_date,
+                    date_end=date_end,
+                    day_of_week=day,
+                ))
+        return schedules
+
+    def batches(self, objects):
+        """ Split iterable of objects into lists of batch_size """
+        objects = iter(objects)
+        while True:
+            batch = list(islice(objects, self.batch_size))
+            if not batch:
+                return
+            yield batch
+
+    def handle(self, *args, **options):
+        config = dict(PRESETS[options['preset']])
+        for key in config:
+            if options[key] is not None:
+                config[key] = options[key]
+        if config['teachers'] < config['groups']:
+            raise CommandError(
+                'Every group needs an educator, '
+                'number of teachers has to be at least number of groups.')
+        if not 1 <= config['weeks'] <= 52:
+            raise CommandError('Term has to last from 1 to 52 weeks.')
+
+        self.random = random.Random(options['seed'])
+        self.fake = Faker()
+        self.fake.seed_instance(options['seed'])
+        self.batch_size = options['batch_size']
+        date_start = options['date_start']
+        date_end = date_start + datetime.timedelta(
+            weeks=config['weeks'], days=-1)
+
+        start = time.perf_counter()
+        try:
+            with transaction.atomic():
+                total = self.generate(config, date_start, date_end)
+        except ValidationError as error:
+            raise CommandError('\n'.join(error.messages))
+        self.report('Total', total, start)
+
+    def generate(self, config, date_start, date_end):
+        """ Create all objects, return number of created rows """
+        self.total = 0
+        today = datetime.date.today()
+
+        start = time.perf_counter()
+        teachers = self.create_users(config['teachers'], is_teacher=True)
+        self.total += len(teachers)
+        self.report('Teachers', len(teachers), start)
+
+        start = time.perf_counter()
+        groups = self.create_groups(teachers, config['groups'])
+        self.total += len(groups)
+        self.report('Groups', len(groups), start)
+
+        start = time.perf_counter()
+        students = self.create_users(config['students'], is_teacher=False)
+        group_students = {group.pk: [] for group in groups}
+        assignments = []
+        for index, student in enumerate(students):
+            group = groups[index % len(groups)]
+            group_students[group.pk].append(student.pk)
+            assignments.append(StudentGroupAssignment(
+                student=student, group=group,
+                date_start=date_start, date_end=date_end))
+        StudentGroupAssignment.objects.bulk_create(
+            assignments, batch_size=self.batch_size)
+        self.total += len(students) + len(assignments)
+        self.report('Students', len(students) + len(assignments), start)
+
+        start = time.perf_counter()
+        Course.objects.bulk_create([
+            Course(name=name, group=group)
+            for group in groups for name in COURSES
+        ])
+        courses = {group.pk: [] for group in groups}
+        course_qs = Course.objects.filter(group__in=groups).order_by('pk')
+        for course in course_qs:
+            courses[course.group_id].append(course)
+        self.total += len(groups) * len(COURSES)
+        self.report('Courses', len(groups) * len(COURSES), start)
+
+        start = time.perf_counter()
+        periods = self.get_periods()
+        schedules = self.get_schedules(
+            groups, courses, teachers, periods, date_start, date_end)
+        lessons_count = bulk_create_schedules(
+            schedules, batch_size=self.batch_size)
+        self.total += len(schedules) + lessons_count
+        self.report('Schedule', len(schedules) + lessons_count, start)
+
+        # past lessons are realized, some of them cancelled
+        start = time.perf_counter()
+        past_lessons = Lesson.objects.filter(
+            schedule__in=schedules, date__lt=today)
+        past_pks = list(past_lessons.order_by('pk')
+                        .values_list('pk', flat=True))
+        cancelled = set(self.random.sample(past_pks, len(past_pks) // 50))
+        past_lessons.update(status=Lesson.STATUS_REALIZED)
+        for batch in self.batches(sorted(cancelled)):
+            Lesson.objects.filter(pk__in=batch)\
+                .update(status=Lesson.STATUS_CANCELLED)
+        self.report('Lesson status', len(past_pks), start)
+
+        start = time.perf_counter()
+        realized = past_lessons.filter(status=Lesson.STATUS_REALIZED)\
+            .order_by('pk')\
+            .values_list('pk', 'schedule__course__group')
+        statuses = [Attendance.STATUS_PRESENT] * 18 \
+            + [Attendance.STATUS_LATE, Attendance.STATUS_ABSENT]
+        attendances = (
+            Attendance(
+                lesson_id=lesson_pk,
+                student_id=student_pk,
+                status=self.random.choice(statuses))
+            for lesson_pk, group_pk in realized.iterator()
+            for student_pk in group_students[group_pk]
+        )
+        count = 0
+        for batch in self.batches(attendances):
+            Attendance.objects.bulk_create(batch)
+            count += len(batch)
+        # lessons' counters, computed with one GROUP BY
+        repair_attendance_counts(batch_size=self.batch_size)
+        self.total += count
+        self.report('Attendance', count, start)
+
+        start = time.perf_counter()
+        categories = self.get_or_create_all(
+            Category, [{'name': name, 'defaults': {'weight': weight}}
+                       for name, weight in CATEGORIES])
+        symbols = self.get_or_create_all(
+            Symbol, [{'name': name, 'value': value}
+                     for name, value in SYMBOLS])
+        course_teachers = {
+            schedule.course.pk: schedule.teacher for schedule in schedules}
+        marks = (
+            Mark(
+                student_id=student_pk,
+                teacher=course_teachers[course.pk],
+                course=course,
+                category=self.random.choice(categories),
+                symbol=self.random.choice(symbols))
+            for group in groups
+            for student_pk in group_students[group.pk]
+            for course in courses[group.pk]
+            if course.pk in course_teachers
+            for _ in range(config['marks'])
+        )
+        count = 0
+        for batch in self.batches(marks):
+            Mark.objects.bulk_create(batch)
+            count += len(batch)
+        # courses are created above, so all their marks are new ones -
+        # history is created for them and aggregates are built at once
+        generated = Mark.objects.filter(
+            course__in=[c for group in groups for c in courses[group.pk]])
+        history = (
+            ChangeHistory(
+                mark_id=mark_pk,
+                type=ChangeHistory.TYPE_ADD,
+                user_id=teacher_pk,
+                value_new_id=symbol_pk)
+            for mark_pk, teacher_pk, symbol_pk in generated
+            .order_by('pk')
+            .values_list('pk', 'teacher', 'symbol')
+            .iterator()
+        )
+        for batch in self.batches(history):
+            ChangeHistory.objects.bulk_create(batch)
+        aggregates = MarkAggregate.from_marks(generated)
+        MarkAggregate.objects.bulk_create(
+            aggregates, batch_size=self.batch_size)
+        self.total += count * 2 + len(aggregates)
+        self.report('Marks', count * 2 + len(aggregates), start)
+        return self.total
+
+    def get_or_create_all(self, model, values_list):
+        """ Return list of model instances, created if missing """
+        instances = []
+        for values in values_list:
+            instance, _ = model.objects.get_or_create(**values)
+            instances.append(instance)
+        return instances
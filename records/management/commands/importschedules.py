@@ -0,0 +1,98 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from records.models import Course, Period, Schedule, User
+from records.utils.schedule import bulk_create_schedules
+import csv
+import datetime
+import json
+import os
+
+
+class Command(BaseCommand):
+    help = (
+        "Import schedule entries from CSV or JSON file. Every entry needs "
+        "'course', 'teacher' and 'period' pks and 'date_start', 'date_end' "
+        "dates (YYYY-MM-DD). Entries are validated all together, nothing "
+        "is created if any of them is invalid."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='Path to .csv or .json file.')
+        parser.add_argument(
+            '--format', choices=['csv', 'json'],
+            help='File format. Guessed from file extension by default.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of rows inserted per query.'
+        )
+
+    def read_entries(self, path, file_format):
+        try:
+            with open(path, newline='', encoding='utf-8-sig') as file:
+                if file_format == 'json':
+                    entries = json.load(file)
+                else:
+                    entries = list(csv.DictReader(file))
+        except (OSError, UnicodeDecodeError, ValueError, csv.Error) as error:
+            raise CommandError(error)
+        if not isinstance(entries, list):
+            raise CommandError('JSON file has to contain list of entries.')
+        return entries
+
+    def parse_entry(self, entry):
+        """ Return dict of entry's pks and dates """
+        return {
+            'course': int(entry['course']),
+            'teacher': int(entry['teacher']),
+            'period': int(entry['period']),
+            'date_start': datetime.date.fromisoformat(entry['date_start']),
+            'date_end': datetime.date.fromisoformat(entry['date_end']),
+        }
+
+    def get_schedules(self, entries):
+        """ Build unsaved Schedules, fetching related objects in bulk """
+        parsed = []
+        for number, entry in enumerate(entries, start=1):
+            try:
+                parsed.append(self.parse_entry(entry))
+            except KeyError as error:
+                raise CommandError(
+                    'Entry %i: missing %s.' % (number, error))
+            except (ValueError, TypeError) as error:
+                raise CommandError('Entry %i: %s' % (number, error))
+
+        related = {
+            'course': Course.objects.select_related('group'),
+            'teacher': User.objects.filter(is_teacher=True),
+            'period': Period.objects.all(),
+        }
+        for field, qs in related.items():
+            related[field] = qs.in_bulk({entry[field] for entry in parsed})
+
+        schedules = []
+        for number, entry in enumerate(parsed, start=1):
+            for field, objects in related.items():
+                if entry[field] not in objects:
+                    raise CommandError('Entry %i: invalid %s %i.' % (
+                        number, field, entry[field]))
+                entry[field] = objects[entry[field]]
+            schedules.append(Schedule(**entry))
+        return schedules
+
+    def handle(self, *args, **options):
+        path = options['path']
+        file_format = options['format'] or \
+            os.path.splitext(path)[1].lstrip('.').lower()
+        if file_format not in ('csv', 'json'):
+            raise CommandError('Unknown file format: %s' % file_format)
+
+        schedules = self.get_schedules(self.read_entries(path, file_format))
+        try:
+            lessons_count = bulk_create_schedules(
+                schedules, batch_size=options['batch_size'])
+        except ValidationError as error:
+            raise CommandError(
+                'Invalid entries:\n' + '\n'.join(error.messages))
+        self.stdout.write('%i schedule entries and %i lessons created.' % (
+            len(schedules), lessons_count))
@@ -0,0 +1,102 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from contextlib import nullcontext
+from records.utils.student_import import (
+    CREDENTIALS_HEADER, StudentImportError, get_credentials_rows,
+    import_students, parse_students_csv, split_duplicates
+)
+import csv
+import os
+import time
+
+
+class Command(BaseCommand):
+    help = (
+        "Create student accounts from CSV file with header row of User "
+        "field names (last_name and first_name are required). Students "
+        "already existing (same names and birth date) are skipped. "
+        "Credentials sheet (CSV with generated usernames and passwords) "
+        "is written to stdout or --output file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='Path of CSV file (UTF-8).')
+        parser.add_argument(
+            '--output',
+            help='Path of credentials CSV file. Written to stdout '
+                 'by default.'
+        )
+        parser.add_argument(
+            '--skip-invalid', action='store_true',
+            help='Import valid rows even if some rows are invalid.'
+        )
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only validate file and report duplicates.'
+        )
+        parser.add_argument(
+            '--workers', type=int,
+            help='Number of processes hashing passwords, number of CPUs '
+                 'by default.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=500,
+            help='Number of rows inserted per query.'
+        )
+
+    def handle(self, *args, **options):
+        try:
+            with open(options['file'], newline='',
+                      encoding='utf-8-sig') as file:
+                students, errors = parse_students_csv(file)
+        except (OSError, UnicodeDecodeError, csv.Error,
+                StudentImportError) as error:
+            raise CommandError(error)
+
+        for line, error in errors.items():
+            self.stderr.write('Line %i: %s' % (line, '; '.join(
+                '%s: %s' % (field, ' '.join(messages))
+                for field, messages in error.message_dict.items()
+            )))
+        if errors and not options['skip_invalid']:
+            raise CommandError(
+                '%i invalid rows, nothing imported. Use --skip-invalid '
+                'to import valid rows.' % len(errors))
+
+        students, duplicates = split_duplicates(students)
+        for line, student in duplicates:
+            self.stderr.write('Line %i: %s already exists, skipped.' % (
+                line, student))
+        if options['dry_run']:
+            self.stderr.write('%i students would be imported.' % (
+                len(students)))
+            return
+
+        try:
+            output = open(options['output'], 'w', encoding='utf-8',
+                          newline='') \
+                if options['output'] else nullcontext(self.stdout)
+        except OSError as error:
+            raise CommandError(error)
+        start = time.perf_counter()
+        try:
+            # credentials are written (and file closed) before import is
+            # committed, so generated passwords can't get lost
+            with transaction.atomic(), output as file:
+                credentials = import_students(
+                    [student for _, student in students],
+                    workers=options['workers'] or os.cpu_count(),
+                    batch_size=options['batch_size'],
+                )
+                self.write_credentials(file, credentials)
+        except OSError as error:
+            raise CommandError(error)
+        self.stderr.write('%i students imported in %.2fs, %i skipped.' % (
+            len(credentials), time.perf_counter() - start,
+            len(duplicates) + len(errors)))
+
+    @staticmethod
+    def write_credentials(file, credentials):
+        writer = csv.writer(file)
+        writer.writerow(CREDENTIALS_HEADER)
+        writer.writerows(get_credentials_rows(credentials))
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from records.models import Mark, MarkAggregate
+
+
+class Command(BaseCommand):
+    help = "Rebuild all students' marks aggregates from scratch."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of aggregates inserted per query.'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            MarkAggregate.objects.all().delete()
+            aggregates = MarkAggregate.from_marks(Mark.objects.all())
+            MarkAggregate.objects.bulk_create(
+                aggregates, batch_size=options['batch_size']
+            )
+        self.stdout.write('%i mark aggregates rebuilt.' % len(aggregates))
@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from records.utils.attendance import repair_attendance_counts
+import time
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute lessons' attendance counters (present, late, absent, "
+        "total) from attendances, aggregated with one GROUP BY query. "
+        "Only lessons with wrong counters are updated."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run', action='store_true',
+            help='Only report number of lessons with wrong counters.'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of lessons updated per query.'
+        )
+
+    def handle(self, *args, **options):
+        start = time.perf_counter()
+        count = repair_attendance_counts(
+            batch_size=options['batch_size'],
+            dry_run=options['dry_run'],
+        )
+        if options['dry_run']:
+            self.stdout.write('%i lessons with wrong counters.' % count)
+        else:
+            self.stdout.write('%i lessons repaired in %.2fs.' % (
+                count, time.perf_counter() - start))
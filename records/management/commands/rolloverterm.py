@@ -0,0 +1,81 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from records.models import Schedule
+from records.utils.schedule import get_schedules_errors, sync_lessons_bulk
+import datetime
+import time
+
+
+def date_type(value):
+    return datetime.date.fromisoformat(value)
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate Lessons for all schedule entries active on given date "
+        "(today by default). With --date-end, entries are moved to new "
+        "ending date first. Lessons are synced in bulk, post_save signal "
+        "of Schedule isn't sent for the entries."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--active-on', type=date_type, default=datetime.date.today(),
+            help='Select entries active on this date (YYYY-MM-DD).'
+        )
+        parser.add_argument(
+            '--group', type=int, action='append', dest='groups',
+            help='Limit entries to student group pk. Can be repeated.'
+        )
+        parser.add_argument(
+            '--date-end', type=date_type,
+            help='New ending date of selected entries (YYYY-MM-DD).'
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=1000,
+            help='Number of rows inserted per query.'
+        )
+
+    def get_schedules(self, options):
+        qs = Schedule.objects.filter(
+            date_start__lte=options['active_on'],
+            date_end__gte=options['active_on']
+        ).select_related('teacher', 'course', 'course__group', 'period')
+        if options['groups']:
+            qs = qs.filter(course__group__in=options['groups'])
+        return list(qs)
+
+    def handle(self, *args, **options):
+        schedules = self.get_schedules(options)
+        start = time.perf_counter()
+        try:
+            with transaction.atomic():
+                if options['date_end']:
+                    for schedule in schedules:
+                        schedule.date_end = options['date_end']
+                    errors = get_schedules_errors(schedules)
+                    if errors:
+                        raise ValidationError([
+                            "%s: %s" % (schedules[index], message)
+                            for index, error in sorted(errors.items())
+                            for message in error.messages
+                        ])
+                    # bulk_update doesn't send post_save, so sync_lessons
+                    # isn't run for every entry
+                    Schedule.objects.bulk_update(
+                        schedules, ['date_end'],
+                        batch_size=options['batch_size'])
+                created, deleted = sync_lessons_bulk(
+                    schedules, batch_size=options['batch_size'])
+        except ValidationError as error:
+            raise CommandError('\n'.join(error.messages))
+
+        elapsed = time.perf_counter() - start
+        self.stdout.write(
+            '%i schedule entries processed, %i lessons created, '
+            '%i deleted in %.2fs (%.0f rows/s).' % (
+                len(schedules), created, deleted, elapsed,
+                (created + deleted) / elapsed if elapsed else 0
+            )
+        )
@@ -0,0 +1,26 @@
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from records.models import User
+from records.utils.schedule import warm_teacher_dashboards
+import time
+
+
+class Command(BaseCommand):
+    help = (
+        "Precompute and cache teachers' dashboards - current week's "
+        "timetables and numbers of unrealized lessons. Meant to be run "
+        "daily, before teachers log in. Needs cache shared between "
+        "processes (see CACHE_BACKEND setting)."
+    )
+
+    def handle(self, *args, **options):
+        if isinstance(caches['default'], LocMemCache):
+            raise CommandError(
+                'Local memory cache is used, dashboards cached by this '
+                'command would be lost when it exits. Set CACHE_BACKEND '
+                'to shared backend.')
+        start = time.perf_counter()
+        count = warm_teacher_dashboards(User.objects.filter(is_teacher=True))
+        self.stdout.write('Dashboards of %i teachers cached in %.2fs.' % (
+            count, time.perf_counter() - start))
@@ -0,0 +1,96 @@
+from collections import Counter
+from contextlib import ExitStack
+from django.conf import settings
+from django.db import connections
+import logging
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class QueryStats:
+    """
+    Database execute wrapper (see connection.execute_wrapper) counting
+    queries, their total duration and repeated statements.
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        # same SQL with same params
+        self.statements = Counter()
+        # same SQL with any params, e.g. query run for every row of a list
+        self.similar = Counter()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.duration += time.perf_counter() - start
+            self.count += 1
+            self.statements[(sql, repr(params))] += 1
+            self.similar[sql] += 1
+
+    @staticmethod
+    def _repeated(counter):
+        return sum(count - 1 for count in counter.values() if count > 1)
+
+    @property
+    def duplicates(self):
+        return self._repeated(self.statements)
+
+    @property
+    def similar_count(self):
+        return self._repeated(self.similar)
+
+    def most_repeated(self):
+        """ Return tuple (SQL, number of runs) of most repeated statement """
+        if not self.similar:
+            return None, 0
+        return self.similar.most_common(1)[0]
+
+
+class SQLTimingMiddleware:
+    """
+    Measure database queries of every request on all connections.
+    Numbers are added as Server-Timing header (visible in browser's
+    devtools) and requests taking at least SQL_TIMING_THRESHOLD_MS
+    milliseconds are logged as one key=value line.
+    Enabled by setting SQL_TIMING = True in settings_local.py.
+    Note: queries run while streaming response's content aren't measured.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.threshold = getattr(settings, 'SQL_TIMING_THRESHOLD_MS', 500)
+
+    def __call__(self, request):
+        stats = QueryStats()
+        start = time.perf_counter()
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(stats))
+            response = self.get_response(request)
+        total_ms = (time.perf_counter() - start) * 1000
+        db_ms = stats.duration * 1000
+
+        response['Server-Timing'] = ', '.join([
+            'db;dur=%.1f;desc="%i queries"' % (db_ms, stats.count),
+            'dup;desc="%i duplicate, %i similar queries"' % (
+                stats.duplicates, stats.similar_count),
+            'app;dur=%.1f' % (total_ms - db_ms),
+            'total;dur=%.1f' % total_ms,
+        ])
+
+        if total_ms >= self.threshold:
+            sql, runs = stats.most_repeated()
+            logger.warning(
+                'slow_request method=%s path=%s status=%i total_ms=%.1f '
+                'db_ms=%.1f queries=%i duplicates=%i similar=%i '
+                'most_repeated_runs=%i most_repeated_sql="%s"',
+                request.method, request.path, response.status_code,
+                total_ms, db_ms, stats.count, stats.duplicates,
+                stats.similar_count, runs, (sql or '')[:200]
+            )
+        return response
@@ -0,0 +1,32 @@
+# Generated by Django 3.2.4 on 2026-10-18 14:49
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0010_auto_20210808_1830'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MarkAggregate',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='Number of marks')),
+                ('category_counts', models.JSONField(default=dict, verbose_name='Number of marks by category')),
+                ('value_sum', models.DecimalField(decimal_places=2, default=0, max_digits=10, verbose_name='Sum of values')),
+                ('mean', models.DecimalField(blank=True, decimal_places=2, max_digits=3, null=True, verbose_name='Mean')),
+                ('course', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='mark_aggregates', to='records.course')),
+                ('student', models.ForeignKey(limit_choices_to={'is_teacher': False}, on_delete=django.db.models.deletion.CASCADE, related_name='mark_aggregates', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Mark aggregate',
+                'verbose_name_plural': 'Mark aggregates',
+                'unique_together': {('student', 'course')},
+            },
+        ),
+    ]
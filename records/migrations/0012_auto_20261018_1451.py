@@ -0,0 +1,21 @@
+# Generated by Django 3.2.4 on 2026-10-18 14:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0011_markaggregate'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='studentgroupassignment',
+            index=models.Index(fields=['group', 'date_start', 'date_end'], name='records_sga_group_dates_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='studentgroupassignment',
+            index=models.Index(fields=['student', 'date_start', 'date_end'], name='records_sga_student_dates_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 3.2.4 on 2026-10-18 15:02
+
+from django.db import migrations, models
+import django.db.models.functions.text
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0012_auto_20261018_1451'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Upper('last_name'), django.db.models.functions.text.Upper('first_name'), name='records_user_name_upper_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(django.db.models.functions.text.Upper('first_name'), name='records_user_first_upper_idx'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 3.2.4 on 2026-10-18 15:04
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0013_auto_20261018_1502'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['date', 'id'], name='records_lesson_date_idx'),
+        ),
+    ]
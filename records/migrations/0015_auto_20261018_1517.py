@@ -0,0 +1,57 @@
+# Generated by Django 3.2.4 on 2026-10-18 15:17
+
+from django.db import migrations, models
+from django.db.models import Count, Q
+
+
+def fill_attendance_counts(apps, schema_editor):
+    """ Compute counters of existing lessons with one GROUP BY query """
+    Lesson = apps.get_model('records', 'Lesson')
+    Attendance = apps.get_model('records', 'Attendance')
+    counts = {
+        'attendance_count': Count('pk'),
+        'present_count': Count('pk', filter=Q(status=0)),
+        'late_count': Count('pk', filter=Q(status=1)),
+        'absent_count': Count('pk', filter=Q(status=2)),
+    }
+    rows = Attendance.objects\
+        .order_by()\
+        .values('lesson')\
+        .annotate(**counts)
+    lessons = [
+        Lesson(pk=row.pop('lesson'), **row)
+        for row in rows
+    ]
+    Lesson.objects.bulk_update(lessons, list(counts), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0014_lesson_records_lesson_date_idx'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='lesson',
+            name='absent_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Absent'),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='attendance_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Attendances'),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='late_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Late'),
+        ),
+        migrations.AddField(
+            model_name='lesson',
+            name='present_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Present'),
+        ),
+        migrations.RunPython(fill_attendance_counts,
+                             migrations.RunPython.noop),
+    ]
@@ -0,0 +1,19 @@
+# Generated by Django 3.2.4 on 2026-10-18 15:20
+
+import django.core.validators
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0015_auto_20261018_1517'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='category',
+            name='weight',
+            field=models.DecimalField(decimal_places=2, default=1, help_text='Weight of marks in weighted mean. From 0 to 99.99.', max_digits=4, validators=[django.core.validators.MinValueValidator(0)], verbose_name='Weight'),
+        ),
+    ]
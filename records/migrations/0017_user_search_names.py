@@ -0,0 +1,51 @@
+# Generated by Django 3.2.4 on 2026-10-18 15:31
+
+from django.db import migrations, models
+
+
+def fill_search_names(apps, schema_editor):
+    """ Set normalised names (see User.normalize_name) of existing users """
+    User = apps.get_model('records', 'User')
+    users = list(User.objects.only('last_name', 'first_name'))
+    for user in users:
+        user.last_name_search = user.last_name.upper()
+        user.first_name_search = user.first_name.upper()
+    User.objects.bulk_update(
+        users, ['last_name_search', 'first_name_search'], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0016_category_weight'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='user',
+            name='records_user_name_upper_idx',
+        ),
+        migrations.RemoveIndex(
+            model_name='user',
+            name='records_user_first_upper_idx',
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='first_name_search',
+            field=models.CharField(default='', editable=False, max_length=150),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='last_name_search',
+            field=models.CharField(default='', editable=False, max_length=150),
+        ),
+        migrations.RunPython(fill_search_names, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['last_name_search', 'first_name_search'], name='records_user_name_search_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='user',
+            index=models.Index(fields=['first_name_search'], name='records_user_first_search_idx'),
+        ),
+    ]
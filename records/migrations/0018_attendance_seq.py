@@ -0,0 +1,18 @@
+# Generated by Django 3.2.4 on 2026-10-18 15:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('records', '0017_user_search_names'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='attendance',
+            name='seq',
+            field=models.PositiveBigIntegerField(default=0, editable=False),
+        ),
+    ]
@@ -7,17 +7,49 @@ from .lesson import Lesson
 from .attendance import Attendance
 from .mark import *
 
-from django.db.models.signals import pre_save, post_save
+from django.db.models.signals import pre_save, post_save, post_delete
 from records.signals.auth import generate_username
-from records.signals.schedule import sync_lessons
-from records.signals.mark import mark_history_pre_save, mark_history_post_save
+from records.signals.schedule import (
+    sync_lessons, timetables_pre_save, invalidate_schedule_timetables,
+    invalidate_lesson_timetables, invalidate_all_timetables_receiver
+)
+from records.signals.assignment import (
+    invalidate_current_assignment, invalidate_current_assignments
+)
+from records.signals.mark import (
+    mark_history_pre_save, mark_history_post_save, mark_aggregate_refresh,
+    category_aggregate_refresh
+)
 
 # generate username for user without one
 pre_save.connect(generate_username, sender=User)
 
+# invalidate cached current assignments
+post_save.connect(invalidate_current_assignment,
+                  sender=StudentGroupAssignment)
+post_delete.connect(invalidate_current_assignment,
+                    sender=StudentGroupAssignment)
+post_save.connect(invalidate_current_assignments, sender=StudentGroup)
+post_delete.connect(invalidate_current_assignments, sender=StudentGroup)
+
 # create new and delete obsolete Lesson instances for saved Schedule
 post_save.connect(sync_lessons, sender=Schedule)
 
+# invalidate cached timetables
+pre_save.connect(timetables_pre_save, sender=Schedule)
+post_save.connect(invalidate_schedule_timetables, sender=Schedule)
+post_delete.connect(invalidate_schedule_timetables, sender=Schedule)
+post_save.connect(invalidate_lesson_timetables, sender=Lesson)
+post_save.connect(invalidate_all_timetables_receiver, sender=Period)
+post_delete.connect(invalidate_all_timetables_receiver, sender=Period)
+post_save.connect(invalidate_all_timetables_receiver, sender=Course)
+post_save.connect(invalidate_all_timetables_receiver, sender=StudentGroup)
+
 # save mark change history
 pre_save.connect(mark_history_pre_save, sender=Mark)
 post_save.connect(mark_history_post_save, sender=Mark)
+
+# keep student's marks aggregate for course current
+post_save.connect(mark_aggregate_refresh, sender=Mark)
+post_delete.connect(mark_aggregate_refresh, sender=Mark)
+post_save.connect(category_aggregate_refresh, sender=Category)
@@ -37,6 +37,10 @@ class Attendance(models.Model):
         related_name='attendances'
     )
 
+    # sequence number of the latest click saved with AttendanceSetView,
+    # earlier requests arriving late are dropped
+    seq = models.PositiveBigIntegerField(default=0, editable=False)
+
     class Meta:
         verbose_name = _('Attendance')
         verbose_name_plural = _('Attendances')
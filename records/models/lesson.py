@@ -1,4 +1,6 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
 from django.utils.translation import gettext_lazy as _
 from django.urls import reverse
 from records.models import attendance
@@ -15,6 +17,14 @@ class Lesson(models.Model):
         (STATUS_CANCELLED, _('Cancelled')),
     ]
 
+    # counter fields and Attendance status they count (None - all)
+    ATTENDANCE_COUNT_FIELDS = {
+        'attendance_count': None,
+        'present_count': attendance.Attendance.STATUS_PRESENT,
+        'late_count': attendance.Attendance.STATUS_LATE,
+        'absent_count': attendance.Attendance.STATUS_ABSENT,
+    }
+
     status = models.IntegerField(
         _('Status'),
         blank=False,
@@ -44,11 +54,27 @@ class Lesson(models.Model):
         max_length=255,
     )
 
+    # denormalized attendance summary, written only by
+    # update_attendance_counts() - see ATTENDANCE_COUNT_FIELDS
+    attendance_count = models.PositiveIntegerField(
+        _('Attendances'), default=0, editable=False)
+    present_count = models.PositiveIntegerField(
+        _('Present'), default=0, editable=False)
+    late_count = models.PositiveIntegerField(
+        _('Late'), default=0, editable=False)
+    absent_count = models.PositiveIntegerField(
+        _('Absent'), default=0, editable=False)
+
     class Meta:
         verbose_name = _('Lesson')
         verbose_name_plural = _('Lessons')
         ordering = ['-date']
         unique_together = ['schedule', 'date']
+        # keyset pagination of lesson lists, see views.lesson
+        indexes = [
+            models.Index(fields=['date', 'id'],
+                         name='records_lesson_date_idx'),
+        ]
 
     @property
     def is_realized(self):
@@ -73,32 +99,84 @@ class Lesson(models.Model):
         objs = [Lesson(schedule=schedule, date=date) for date in dates]
         Lesson.objects.bulk_create(objs)
 
+    @classmethod
+    def update_attendance_counts(cls, pks):
+        """
+        Recompute attendance counters of lessons with provided pks with
+        one UPDATE query (subquery counting attendances per counter).
+        Should be called in the same transaction as attendances' change.
+        """
+        counts = {}
+        for field, status in cls.ATTENDANCE_COUNT_FIELDS.items():
+            attendances = attendance.Attendance.objects\
+                .filter(lesson=OuterRef('pk'))\
+                .order_by()
+            if status is not None:
+                attendances = attendances.filter(status=status)
+            attendances = attendances\
+                .values('lesson')\
+                .annotate(count=Count('pk'))\
+                .values('count')
+            counts[field] = Coalesce(Subquery(attendances), 0)
+        cls.objects.filter(pk__in=pks).update(**counts)
+
+    def save(self, *args, **kwargs):
+        """
+        Don't write attendance counters of existing lesson, so counters
+        updated by concurrent request aren't overwritten by stale ones.
+        """
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key
+                and field.name not in self.ATTENDANCE_COUNT_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
     def sync_attendances(self):
         """
         Create Attendances related to Lesson. If lesson is cancelled,
-        delete all related attendances
+        delete all related attendances.
+        Students are compared by primary keys - if group roster didn't
+        change since last sync, nothing is written.
+        Attendance counters are updated in the same transaction.
         """
 
         # delete attendances for cancelled lesson and exit
         if self.is_cancelled:
-            self.attendances.all().delete()
+            with transaction.atomic():
+                if self.attendances.all().delete()[0]:
+                    self.update_attendance_counts([self.pk])
             return
 
-        # get list of students by date
+        # get pks of students assigned to the group by date
         group = self.schedule.course.group
-        students = group.get_students_by_date(self.date)
-
-        # create list of students that don't have related Attendance created
-        missing_attendances = list(students)
-        for att in self.attendances.all():
-            if att.student in missing_attendances:
-                missing_attendances.remove(att.student)
-            else:
-                att.delete()
-
-        # create missing Attendances
-        for student in missing_attendances:
-            attendance.Attendance(lesson=self, student=student).save()
+        students_pks = set(
+            group.get_assignments_by_date(self.date)
+            .order_by()
+            .values_list('student', flat=True)
+        )
+        attendances_pks = set(
+            self.attendances.order_by().values_list('student', flat=True)
+        )
+        if students_pks == attendances_pks:
+            return
+
+        with transaction.atomic():
+            # delete Attendances of students no longer in the group
+            to_delete = attendances_pks - students_pks
+            if to_delete:
+                self.attendances.filter(student__in=to_delete).delete()
+
+            # create missing Attendances, ignore ones created meanwhile
+            # by concurrent request
+            to_create = students_pks - attendances_pks
+            attendance.Attendance.objects.bulk_create(
+                [attendance.Attendance(lesson=self, student_id=pk)
+                 for pk in to_create],
+                ignore_conflicts=True
+            )
+            self.update_attendance_counts([self.pk])
 
     def get_absolute_url(self):
         return reverse("lesson:update", kwargs={"pk": self.pk})
@@ -1,4 +1,5 @@
 from .category import Category
 from .changehistory import ChangeHistory
-from .mark import Mark
+from .mark import Mark, ConcurrentModificationError
 from .symbol import Symbol
+from .aggregate import MarkAggregate
@@ -0,0 +1,150 @@
+from decimal import Decimal
+from django.db import models, transaction
+from django.db.models import Count, Sum
+from django.utils.translation import gettext_lazy as _
+from records.models.mark import mark
+
+
+class MarkAggregate(models.Model):
+    """
+    Denormalized summary of student's marks in a course.
+    Kept current by Mark's post_save/post_delete signals,
+    can be rebuilt from scratch with 'rebuildmarkaggregates' command.
+    - category_counts - dict {category pk (str): number of marks}
+    - mean - mean of marks' values weighted by their categories
+    """
+    student = models.ForeignKey(
+        "records.User",
+        limit_choices_to={'is_teacher': False},
+        on_delete=models.CASCADE,
+        blank=False,
+        null=False,
+        related_name='mark_aggregates'
+    )
+
+    course = models.ForeignKey(
+        "records.Course",
+        on_delete=models.CASCADE,
+        blank=False,
+        null=False,
+        related_name='mark_aggregates'
+    )
+
+    count = models.PositiveIntegerField(
+        _('Number of marks'),
+        default=0
+    )
+
+    category_counts = models.JSONField(
+        _('Number of marks by category'),
+        default=dict
+    )
+
+    value_sum = models.DecimalField(
+        _('Sum of values'),
+        max_digits=10,
+        decimal_places=2,
+        default=0
+    )
+
+    mean = models.DecimalField(
+        _('Mean'),
+        max_digits=3,
+        decimal_places=2,
+        blank=True,
+        null=True
+    )
+
+    class Meta:
+        verbose_name = _('Mark aggregate')
+        verbose_name_plural = _('Mark aggregates')
+        unique_together = ['student', 'course']
+
+    @classmethod
+    def from_marks(cls, marks):
+        """
+        Return list of unsaved aggregates computed from Marks queryset,
+        with single GROUP BY query. Mean is weighted by marks' categories.
+        """
+        rows = marks\
+            .order_by()\
+            .values_list('student', 'course', 'category', 'category__weight')\
+            .annotate(count=Count('pk'), value_sum=Sum('symbol__value'))
+
+        aggregates = {}
+        weighted = {}
+        for student, course, category, weight, count, value_sum in rows:
+            key = (student, course)
+            if key not in aggregates:
+                aggregates[key] = cls(
+                    student_id=student,
+                    course_id=course,
+                    category_counts={}
+                )
+                weighted[key] = [Decimal(0), Decimal(0)]
+            aggregate = aggregates[key]
+            aggregate.count += count
+            aggregate.value_sum += value_sum
+            aggregate.category_counts[str(category)] = count
+            weighted[key][0] += value_sum * weight
+            weighted[key][1] += count * weight
+
+        for key, aggregate in aggregates.items():
+            values_sum, weights_sum = weighted[key]
+            aggregate.mean = (values_sum / weights_sum)\
+                .quantize(Decimal('0.01')) if weights_sum else None
+        return list(aggregates.values())
+
+    @classmethod
+    def refresh(cls, students, courses):
+        """
+        Recompute aggregates for every pair of provided students
+        and courses (pks or instances), with constant number of queries.
+        Rows are upserted - missing ones are inserted (ignoring conflicts)
+        and all are locked before marks are read, so concurrent refreshes
+        of the same pair wait for each other instead of breaking unique
+        constraint. Rows of pairs without marks are deleted.
+        """
+        students = {getattr(student, 'pk', student) for student in students}
+        courses = {getattr(course, 'pk', course) for course in courses}
+        with transaction.atomic():
+            cls.objects.bulk_create([
+                cls(student_id=student, course_id=course)
+                for student in students for course in courses
+            ], ignore_conflicts=True)
+            existing = cls.objects\
+                .select_for_update()\
+                .filter(student__in=students, course__in=courses)\
+                .order_by()\
+                .values_list('student', 'course', 'pk')
+            pks = {(student, course): pk for student, course, pk in existing}
+
+            aggregates = cls.from_marks(mark.Mark.objects.filter(
+                student__in=students, course__in=courses))
+            for aggregate in aggregates:
+                aggregate.pk = pks.pop(
+                    (aggregate.student_id, aggregate.course_id))
+            cls.objects.bulk_update(
+                aggregates, ['count', 'category_counts', 'value_sum', 'mean'])
+            if pks:
+                cls.objects.filter(pk__in=pks.values()).delete()
+
+    @classmethod
+    def refresh_category(cls, category):
+        """
+        Recompute aggregates with marks in category (pk or instance),
+        e.g. after its weight changed. Refreshed course by course.
+        """
+        pairs = mark.Mark.objects\
+            .filter(category=category)\
+            .order_by()\
+            .values_list('course', 'student')\
+            .distinct()
+        by_course = {}
+        for course, student in pairs:
+            by_course.setdefault(course, set()).add(student)
+        for course, students in by_course.items():
+            cls.refresh(students, [course])
+
+    def __str__(self):
+        return "{}, {}: {}".format(self.student, self.course, self.mean)
@@ -1,5 +1,5 @@
 from django.db import models
-from django.core.validators import MinLengthValidator
+from django.core.validators import MinLengthValidator, MinValueValidator
 from django.utils.translation import gettext_lazy as _
 
 
@@ -18,5 +18,14 @@ class Category(models.Model):
         help_text=_('Required. 3 - 60 characters.')
     )
 
+    weight = models.DecimalField(
+        _('Weight'),
+        max_digits=4,
+        decimal_places=2,
+        default=1,
+        validators=[MinValueValidator(0)],
+        help_text=_('Weight of marks in weighted mean. From 0 to 99.99.')
+    )
+
     def __str__(self):
         return str(self.name)
@@ -2,6 +2,11 @@ from django.db import models
 from django.utils.translation import gettext_lazy as _
 
 
+class ConcurrentModificationError(Exception):
+    """ Raised when saved Mark was modified since expected date_modified """
+    pass
+
+
 class Mark(models.Model):
     student = models.ForeignKey(
         "records.User",
@@ -57,7 +62,18 @@ class Mark(models.Model):
 
     # attributes used in pre and post_save signals to save change history
     modifying_user = None
-    value_old = None
+    value_old_id = None
+    # student and course from before change, their aggregate is refreshed
+    # too if mark was moved
+    student_old_id = None
+    course_old_id = None
+    # set while history and aggregates of many marks are saved at once by
+    # bulk_create_marks(), signal handlers skip such marks
+    batched = False
+    # date_modified the change is based on, checked on update if set
+    expected_date_modified = None
+    # field values as loaded from database, see from_db()
+    _loaded_values = None
 
     class Meta:
         verbose_name = _('Mark')
@@ -67,3 +83,60 @@ class Mark(models.Model):
 
     def __str__(self):
         return str(self.symbol)
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        """ Remember loaded values, so changes can be tracked without query """
+        instance = super().from_db(db, field_names, values)
+        instance._loaded_values = dict(zip(field_names, values))
+        return instance
+
+    def refresh_from_db(self, *args, **kwargs):
+        super().refresh_from_db(*args, **kwargs)
+        # refreshed fields aren't tracked, fall back to query
+        self._loaded_values = None
+
+    def get_original_values(self, *fields):
+        """
+        Return dict of fields' values (attnames) stored in database, uses
+        values remembered on load if available, otherwise queries database.
+        """
+        loaded = self._loaded_values or {}
+        if all(field in loaded for field in fields):
+            return {field: loaded[field] for field in fields}
+        return Mark.objects.filter(pk=self.pk).values(*fields).first() or {}
+
+    def get_original_symbol_id(self):
+        """ Return pk of Symbol stored in database """
+        return self.get_original_values('symbol_id').get('symbol_id')
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        # saved state becomes the new base for change tracking
+        self._loaded_values = {
+            field.attname: getattr(self, field.attname)
+            for field in self._meta.concrete_fields
+        }
+        self.value_old_id = None
+        self.student_old_id = None
+        self.course_old_id = None
+        self.expected_date_modified = None
+
+    def _do_update(self, base_qs, using, pk_val, values, update_fields,
+                   forced_update):
+        """
+        If expected_date_modified is set, update row only if it wasn't
+        modified in the meantime - optimistic concurrency check without
+        row locks.
+        """
+        if self.expected_date_modified is None:
+            return super()._do_update(
+                base_qs, using, pk_val, values, update_fields, forced_update)
+
+        base_qs = base_qs.filter(date_modified=self.expected_date_modified)
+        updated = super()._do_update(
+            base_qs, using, pk_val, values, update_fields, forced_update)
+        if not updated:
+            raise ConcurrentModificationError(
+                _('Mark was modified by another user.'))
+        return updated
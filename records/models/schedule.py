@@ -1,5 +1,6 @@
 from django.core.exceptions import ValidationError
 from django.db import models, transaction
+from django.db.models import Q
 from django.urls.base import reverse_lazy
 from django.utils.translation import gettext_lazy as _
 from django.conf import settings
@@ -88,50 +89,83 @@ class Schedule(models.Model):
             date_end__gte=self.date_start,
             day_of_week=self.day_of_week,
             period=self.period
-        ).select_related('teacher', 'course', 'period')
+        ).select_related('teacher', 'course', 'course__group', 'period')
         if self.pk:
             qs = qs.exclude(pk=self.pk)
         return qs
 
     def _get_collisions_by_group(self, qs=None):
-        if not qs:
+        if qs is None:
             qs = self._get_same_time_entries_qs()
-        qs = qs.filter(course__group=self.course.group)
+        qs = qs.filter(course__group=self.course.group_id)
         return list(qs)
 
     def _get_collisions_by_teacher(self, qs=None):
-        if not qs:
+        if qs is None:
             qs = self._get_same_time_entries_qs()
-        qs = qs.filter(teacher=self.teacher)
+        qs = qs.filter(teacher=self.teacher_id)
         return list(qs)
 
-    def _check_collisions(self):
+    def collides_with(self, other):
         """
-        Check for collisions (if selected teacher or student group
-        already have planned lesson at that time)
+        Return tuple of bools (same group, same teacher) for other entry
+        planned at the same time. Both False if there's no collision.
+        Compares loaded instances only, without querying database.
+        """
+        if self.day_of_week != other.day_of_week \
+                or self.period_id != other.period_id \
+                or self.date_start > other.date_end \
+                or self.date_end < other.date_start:
+            return False, False
+        return (
+            self.course.group_id == other.course.group_id,
+            self.teacher_id == other.teacher_id
+        )
+
+    @staticmethod
+    def get_collisions_error(collisions_group, collisions_teacher):
+        """
+        Return ValidationError for colliding entries lists,
+        None if both lists are empty.
         """
-        raise_error = False
         errors = {}
-        qs = self._get_same_time_entries_qs()
-        collisions_group = self._get_collisions_by_group(qs)
-        collisions_teacher = self._get_collisions_by_teacher(qs)
         error_msg = _("Colliding entries: %(collisions)s")
         if collisions_group:
             errors['course'] = error_msg % {
                 'collisions': "; ".join(map(str, collisions_group))
             }
-            raise_error = True
         if collisions_teacher:
             errors['teacher'] = error_msg % {
                 'collisions': "; ".join(map(str, collisions_teacher))
             }
-            raise_error = True
+        if errors:
+            return ValidationError(errors)
+        return None
 
-        if raise_error:
-            raise ValidationError(errors)
-
-    def clean(self) -> None:
-        super().clean()
+    def _check_collisions(self):
+        """
+        Check for collisions (if selected teacher or student group
+        already have planned lesson at that time)
+        """
+        # fetch entries colliding by group or teacher with one query
+        qs = self._get_same_time_entries_qs().filter(
+            Q(course__group=self.course.group_id) | Q(teacher=self.teacher_id)
+        )
+        collisions_group = []
+        collisions_teacher = []
+        for entry in qs:
+            same_group, same_teacher = self.collides_with(entry)
+            if same_group:
+                collisions_group.append(entry)
+            if same_teacher:
+                collisions_teacher.append(entry)
+
+        error = self.get_collisions_error(collisions_group, collisions_teacher)
+        if error:
+            raise error
+
+    def _check_dates(self):
+        """ Validate dates range, without querying database """
         # check if ending date isn't earlier than starting date
         if self.date_end < self.date_start:
             raise ValidationError({
@@ -146,6 +180,9 @@ class Schedule(models.Model):
                 'date_end': _("Schedule length can't exceed 365 days.")
             })
 
+    def clean(self) -> None:
+        super().clean()
+        self._check_dates()
         self.day_of_week = self.date_start.weekday()
         self._check_collisions()
 
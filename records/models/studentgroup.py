@@ -99,6 +99,13 @@ class StudentGroupAssignment(models.Model):
         verbose_name = _('Group assignment')
         verbose_name_plural = _('Group assignments')
         ordering = ['student__last_name', 'student__first_name', 'date_start']
+        # assignments are mostly looked up by date range for group/student
+        indexes = [
+            models.Index(fields=['group', 'date_start', 'date_end'],
+                         name='records_sga_group_dates_idx'),
+            models.Index(fields=['student', 'date_start', 'date_end'],
+                         name='records_sga_student_dates_idx'),
+        ]
 
     student = models.ForeignKey(
         verbose_name=_('Student'),
@@ -141,9 +148,22 @@ class StudentGroupAssignment(models.Model):
             qs = qs.exclude(pk=self.pk)
         return qs
 
-    def clean(self):
-        super().clean()
+    def collides_with(self, other):
+        """ Return True if other assignment's dates overlap this one's """
+        return (self.date_start <= other.date_end
+                and self.date_end >= other.date_start)
+
+    def get_collisions_error(self, collisions):
+        """ Return ValidationError listing colliding assignments """
+        return ValidationError(
+            _("Colliding assigments for %(student)s: %(collisions)s"),
+            params={
+                'student': str(self.student),
+                'collisions': ", ".join(map(str, collisions)),
+            }
+        )
 
+    def _check_dates(self):
         # check if ending date is not earlier than start date
         if self.date_end < self.date_start:
             raise ValidationError({
@@ -151,15 +171,14 @@ class StudentGroupAssignment(models.Model):
                     "End date can't be earlier than start date."
                 )
             })
+
+    def clean(self):
+        super().clean()
+
+        self._check_dates()
         colliding_assignments = list(self._get_colliding_assignments())
         if colliding_assignments:
-            raise ValidationError(
-                _("Colliding assigments for %(student)s: %(collisions)s"),
-                params={
-                    'student': str(self.student),
-                    'collisions': ", ".join(map(str, colliding_assignments)),
-                }
-            )
+            raise self.get_collisions_error(colliding_assignments)
 
     def __str__(self):
         return "{} ({} - {})".format(
@@ -3,8 +3,16 @@ from django.contrib.auth.models import AbstractUser
 from django.utils.translation import gettext_lazy as _
 from django.core.exceptions import ValidationError
 from django.urls import reverse
+from django.core.cache import cache
+from records.utils.cache import get_cache_version, bump_cache_version
 import datetime
 
+# current assignments are cached for every student separately,
+# cache version is bumped when any StudentGroup changes
+CURRENT_ASSIGNMENT_CACHE_KEY = 'records:current_assignment:%s:%s'
+CURRENT_ASSIGNMENT_VERSION_KEY = 'records:current_assignment_version'
+CURRENT_ASSIGNMENT_CACHE_TIMEOUT = 60 * 60 * 24
+
 
 class User(AbstractUser):
     """
@@ -32,6 +40,13 @@ class User(AbstractUser):
             ('delete_student', _('Can delete Student')),
             ('reset_student_password', _('Can reset Student\'s password')),
         ]
+        # case-insensitive prefix search by name, see utils.user
+        indexes = [
+            models.Index(fields=['last_name_search', 'first_name_search'],
+                         name='records_user_name_search_idx'),
+            models.Index(fields=['first_name_search'],
+                         name='records_user_first_search_idx'),
+        ]
 
     # Make username unrequired. If left blank during creation/editing,
     # username will be generated by generate_username() called by
@@ -70,6 +85,12 @@ class User(AbstractUser):
 
     is_teacher = models.BooleanField(default=False)
 
+    # names normalised with normalize_name(), set on save
+    last_name_search = models.CharField(
+        max_length=150, editable=False, default='')
+    first_name_search = models.CharField(
+        max_length=150, editable=False, default='')
+
     # Fields required during createsuperuser
     REQUIRED_FIELDS = ['email', 'first_name', 'last_name']
 
@@ -81,13 +102,91 @@ class User(AbstractUser):
     def is_educator(self) -> bool:
         return hasattr(self, 'educated_group')
 
+    @staticmethod
+    def normalize_name(name):
+        """
+        Return name folded for case-insensitive search. Done in Python,
+        because database's UPPER can be limited to ASCII (e.g. SQLite).
+        """
+        return name.upper()
+
+    def set_search_names(self):
+        """ Set normalised names, needed before bulk_create """
+        self.last_name_search = self.normalize_name(self.last_name)
+        self.first_name_search = self.normalize_name(self.first_name)
+
+    def save(self, *args, **kwargs):
+        self.set_search_names()
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and \
+                {'last_name', 'first_name'} & set(update_fields):
+            kwargs['update_fields'] = set(update_fields) | {
+                'last_name_search', 'first_name_search'}
+        super().save(*args, **kwargs)
+
+    @staticmethod
+    def _get_current_assignment_cache_key(pk, date):
+        """ Return tuple (cache key, cache version) """
+        version = get_cache_version(CURRENT_ASSIGNMENT_VERSION_KEY)
+        return CURRENT_ASSIGNMENT_CACHE_KEY % (pk, date), version
+
+    @classmethod
+    def cache_current_assignments(cls, assignments, date=None):
+        """
+        Save dict {student pk: StudentGroupAssignment|None} of assignments
+        current on date in cache.
+        """
+        if not date:
+            date = datetime.date.today()
+        version = get_cache_version(CURRENT_ASSIGNMENT_VERSION_KEY)
+        cache.set_many({
+            CURRENT_ASSIGNMENT_CACHE_KEY % (pk, date): assignment
+            for pk, assignment in assignments.items()
+        }, CURRENT_ASSIGNMENT_CACHE_TIMEOUT, version=version)
+
+    @classmethod
+    def invalidate_current_assignment(cls, pk=None):
+        """
+        Remove student's cached current assignment.
+        If pk not supplied, invalidate cached assignments of all students.
+        """
+        if pk is None:
+            bump_cache_version(CURRENT_ASSIGNMENT_VERSION_KEY)
+            return
+        cls.invalidate_current_assignments([pk])
+
+    @classmethod
+    def invalidate_current_assignments(cls, pks):
+        """ Remove cached current assignments of many students at once """
+        today = datetime.date.today()
+        version = get_cache_version(CURRENT_ASSIGNMENT_VERSION_KEY)
+        cache.delete_many([
+            CURRENT_ASSIGNMENT_CACHE_KEY % (pk, today) for pk in pks
+        ], version=version)
+
     def get_current_assignment(self):
+        """
+        Return current assignment with group selected or None.
+        Result is cached on instance for the request and in Django's cache
+        until student's assignments or any StudentGroup change.
+        """
         today = datetime.date.today()
-        qs = self.assignments.filter(
-            date_start__lte=today,
-            date_end__gte=today,
-        ).select_related('group')
-        return qs.first()
+        cached = getattr(self, '_current_assignment', None)
+        if cached and cached[0] == today:
+            return cached[1]
+
+        key, version = self._get_current_assignment_cache_key(self.pk, today)
+        assignment = cache.get(key, False, version=version)
+        if assignment is False:
+            qs = self.assignments.filter(
+                date_start__lte=today,
+                date_end__gte=today,
+            ).select_related('group')
+            assignment = qs.first()
+            cache.set(key, assignment, CURRENT_ASSIGNMENT_CACHE_TIMEOUT,
+                      version=version)
+        self._current_assignment = (today, assignment)
+        return assignment
 
     @property
     def student_group(self):
@@ -0,0 +1,11 @@
+from records.models import User
+
+
+def invalidate_current_assignment(sender, instance, **kwargs):
+    """ Remove cached current assignment of assignment's student """
+    User.invalidate_current_assignment(instance.student_id)
+
+
+def invalidate_current_assignments(sender, **kwargs):
+    """ Invalidate all cached current assignments (they contain groups) """
+    User.invalidate_current_assignment()
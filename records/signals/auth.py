@@ -7,16 +7,18 @@ import logging
 logger = logging.getLogger(__name__)
 
 
-def generate_username(sender, instance, **kwargs):
+def get_random_username(first_name):
     """
-    Generate random username based on first_name and uuid4.
-    Generated username: {slugified user.first_name}.{random uuid4[:8]}
+    Return random username based on first_name and uuid4:
+    {slugified first_name}.{random uuid4[:8]}
     """
+    return "{}.{}".format(slugify(first_name), uuid.uuid4().hex[:8])
+
+
+def generate_username(sender, instance, **kwargs):
+    """ Generate random username if it's not set """
     if not instance.username:
-        instance.username = "{}.{}".format(
-            slugify(instance.first_name),
-            uuid.uuid4().hex[:8]
-        )
+        instance.username = get_random_username(instance.first_name)
 
 
 def create_default_user_groups(sender, **kwargs):
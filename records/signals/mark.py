@@ -1,32 +1,65 @@
-from records.models import Mark, ChangeHistory
+from records.models import ChangeHistory, MarkAggregate
 
 
 def mark_history_pre_save(sender, instance, *args, **kwargs):
-    """ Load mark value from before change """
-    if instance.pk:
-        qs = Mark.objects\
-            .filter(pk=instance.pk)\
-            .select_related('symbol')
-        old_instance = qs.get()
-
-        instance.value_old = old_instance.symbol
+    """
+    Get mark value, student and course from before change. Values
+    remembered when instance was loaded are used, so no query is needed
+    for fetched marks.
+    """
+    if instance.pk and not instance.batched:
+        original = instance.get_original_values(
+            'symbol_id', 'student_id', 'course_id')
+        instance.value_old_id = original.get('symbol_id')
+        instance.student_old_id = original.get('student_id')
+        instance.course_old_id = original.get('course_id')
 
 
 def mark_history_post_save(sender, instance, created, *args, **kwargs):
     """ Save mark change history"""
+    if instance.batched:
+        return
+    if instance.modifying_user:
+        user_id = instance.modifying_user.pk
+    else:
+        user_id = instance.teacher_id
+
     if created:
         history = ChangeHistory(
             mark=instance,
             type=ChangeHistory.TYPE_ADD,
-            user=instance.modifying_user or instance.teacher,
-            value_new=instance.symbol
+            user_id=user_id,
+            value_new_id=instance.symbol_id
         )
     else:
         history = ChangeHistory(
             mark=instance,
             type=ChangeHistory.TYPE_MODIFY,
-            user=instance.modifying_user or instance.teacher,
-            value_old=instance.value_old,
-            value_new=instance.symbol
+            user_id=user_id,
+            value_old_id=instance.value_old_id,
+            value_new_id=instance.symbol_id
         )
     history.save()
+
+
+def mark_aggregate_refresh(sender, instance, *args, **kwargs):
+    """
+    Recompute student's MarkAggregate for mark's course. If mark was
+    moved to other student or course, previous pair is refreshed too.
+    """
+    if instance.batched:
+        return
+    current = (instance.student_id, instance.course_id)
+    previous = (instance.student_old_id or instance.student_id,
+                instance.course_old_id or instance.course_id)
+    for student_id, course_id in {current, previous}:
+        MarkAggregate.refresh([student_id], [course_id])
+
+
+def category_aggregate_refresh(sender, instance, created, update_fields=None,
+                               *args, **kwargs):
+    """ Recompute aggregates of category's marks, mean depends on weight """
+    if created or (update_fields is not None
+                   and 'weight' not in update_fields):
+        return
+    MarkAggregate.refresh_category(instance)
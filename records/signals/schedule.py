@@ -1,7 +1,10 @@
 from django.core.exceptions import ValidationError
 from django.utils.translation import gettext_lazy as _
-from records.models import Lesson
+from records.models import Lesson, Schedule
 from records.utils.dates import get_dates_between, dates_diff
+from records.utils.schedule import (
+    invalidate_timetables, invalidate_all_timetables
+)
 
 
 def sync_lessons(sender, instance, created, **kwargs):
@@ -44,3 +47,39 @@ def sync_lessons(sender, instance, created, **kwargs):
         # delete redundant Lessons and create missing ones
         to_delete_qs.delete()
         Lesson.from_dates(instance, to_create)
+
+
+def timetables_pre_save(sender, instance, **kwargs):
+    """ Remember Schedule's group, teacher and dates from before change """
+    instance.timetable_old = None
+    if instance.pk:
+        instance.timetable_old = Schedule.objects\
+            .filter(pk=instance.pk)\
+            .values_list('course__group', 'teacher', 'date_start', 'date_end')\
+            .first()
+
+
+def invalidate_schedule_timetables(sender, instance, **kwargs):
+    """
+    Remove cached timetables of Schedule's group and teacher,
+    for weeks in Schedule's dates range, before and after change.
+    """
+    entries = [(instance.course.group_id, instance.teacher_id,
+                instance.date_start, instance.date_end)]
+    if getattr(instance, 'timetable_old', None):
+        entries.append(instance.timetable_old)
+    for group_pk, teacher_pk, date_start, date_end in entries:
+        invalidate_timetables(
+            group_pk, teacher_pk, get_dates_between(date_start, date_end))
+
+
+def invalidate_lesson_timetables(sender, instance, **kwargs):
+    """ Remove cached timetables containing saved Lesson """
+    schedule = instance.schedule
+    invalidate_timetables(
+        schedule.course.group_id, schedule.teacher_id, [instance.date])
+
+
+def invalidate_all_timetables_receiver(sender, **kwargs):
+    """ Invalidate all cached timetables, e.g. after Period change """
+    invalidate_all_timetables()
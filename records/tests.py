@@ -1,3 +1,1066 @@
-from django.test import TestCase
+from django.core.exceptions import ValidationError
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command, CommandError
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.db import connection
+from django.urls import reverse
+from records.models import (
+    User, StudentGroup, StudentGroupAssignment, Course, Period, Schedule,
+    Lesson, Attendance, Category, Symbol, Mark, MarkAggregate, ChangeHistory,
+    ConcurrentModificationError
+)
+from records.utils.mark import get_grade_sheet, get_course_gradebook
+from records.utils.attendance import get_course_register, save_attendances
+from records.utils.user import (
+    prefetch_current_assignments, bulk_create_assignments, search_users
+)
+from records.forms.group import AssignManyToGroupForm
+from records.utils.dates import get_week_dates
+from records.utils.schedule import (
+    bulk_create_schedules, get_schedules_errors, get_cached_group_timetable,
+    get_teacher_dashboard, warm_teacher_dashboards
+)
+from decimal import Decimal
+from io import StringIO
+import csv
+import datetime
+import json
+import os
+import tempfile
+import time
 
-# Create your tests here.
+
+class LessonTestCase(TestCase):
+    """ Base test case with one group's lesson and helper to add students """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.date = datetime.date(2021, 9, 6)
+        cls.teacher = User.objects.create(
+            first_name='John', last_name='Teacher', is_teacher=True)
+        cls.group = StudentGroup.objects.create(
+            name='1A', educator=cls.teacher)
+        cls.course = Course.objects.create(name='Math', group=cls.group)
+        period = Period.objects.create(
+            time_start=datetime.time(8, 0), time_end=datetime.time(8, 45))
+        schedule = Schedule.objects.create(
+            course=cls.course, teacher=cls.teacher, period=period,
+            date_start=cls.date, date_end=cls.date,
+            day_of_week=cls.date.weekday())
+        cls.lesson = Lesson.objects.get(schedule=schedule)
+        cls.category = Category.objects.create(name='Test')
+        cls.symbol = Symbol.objects.create(name='5', value=5)
+
+    def setUp(self):
+        # cached data could outlive rolled back database rows
+        cache.clear()
+
+    def add_students(self, count):
+        for i in range(count):
+            student = User.objects.create(
+                first_name='Student %03d' % i, last_name='Student')
+            StudentGroupAssignment.objects.create(
+                student=student, group=self.group,
+                date_start=self.date, date_end=self.date)
+            for _ in range(2):
+                Mark.objects.create(
+                    student=student, teacher=self.teacher,
+                    course=self.course, category=self.category,
+                    symbol=self.symbol)
+        self.lesson.sync_attendances()
+
+
+class GradeSheetTestCase(LessonTestCase):
+    """ Lesson's grade sheet should be loaded with constant query count """
+
+    def get_sheet(self):
+        sheet = get_grade_sheet(self.lesson)
+        # touch marks' symbols, as template does
+        for data in sheet.values():
+            [str(mark) for mark in data['marks']]
+        return sheet
+
+    def test_grade_sheet_shape(self):
+        self.add_students(3)
+        sheet = self.get_sheet()
+        self.assertEqual(
+            [student.first_name for student in sheet],
+            ['Student 000', 'Student 001', 'Student 002'])
+        for student, data in sheet.items():
+            self.assertEqual(len(data['marks']), 2)
+            self.assertFalse(data['absent'])
+
+    def test_grade_sheet_constant_queries(self):
+        self.add_students(3)
+        with self.assertNumQueries(3):
+            self.get_sheet()
+        self.add_students(30)
+        with self.assertNumQueries(3):
+            sheet = self.get_sheet()
+        self.assertEqual(len(sheet), 33)
+        for data in sheet.values():
+            self.assertEqual(data['aggregate'].count, 2)
+
+
+class MarkAggregateTestCase(LessonTestCase):
+    """ Aggregates should follow saved and deleted marks """
+
+    def get_aggregate(self, student):
+        return MarkAggregate.objects.get(student=student, course=self.course)
+
+    def test_aggregate_follows_marks(self):
+        self.add_students(1)
+        student = User.objects.get(is_teacher=False)
+        aggregate = self.get_aggregate(student)
+        self.assertEqual(aggregate.count, 2)
+        self.assertEqual(aggregate.mean, Decimal('5.00'))
+        self.assertEqual(
+            aggregate.category_counts, {str(self.category.pk): 2})
+
+        mark = student.marks.first()
+        mark.symbol = Symbol.objects.create(name='3', value=3)
+        mark.save()
+        self.assertEqual(self.get_aggregate(student).mean, Decimal('4.00'))
+
+        student.marks.first().delete()
+        student.marks.first().delete()
+        self.assertFalse(student.mark_aggregates.exists())
+
+    def test_aggregate_follows_moved_mark(self):
+        self.add_students(2)
+        first, second = User.objects.filter(is_teacher=False)
+        other_course = Course.objects.create(name='Art', group=self.group)
+        mark = first.marks.first()
+        mark.student = second
+        mark.save()
+        self.assertEqual(self.get_aggregate(first).count, 1)
+        self.assertEqual(self.get_aggregate(second).count, 3)
+
+        # instance not loaded from database
+        mark = Mark(pk=mark.pk, student=second, teacher=self.teacher,
+                    course=other_course, symbol=self.symbol)
+        mark.save(update_fields=['course'])
+        self.assertEqual(self.get_aggregate(second).count, 2)
+        self.assertEqual(MarkAggregate.objects.get(
+            student=second, course=other_course).count, 1)
+
+    def test_weighted_mean(self):
+        self.add_students(1)
+        student = User.objects.get(is_teacher=False)
+        heavy = Category.objects.create(name='Exam', weight=3)
+        Mark.objects.create(
+            student=student, teacher=self.teacher, course=self.course,
+            category=heavy, symbol=Symbol.objects.create(name='1', value=1))
+        # (5 + 5 + 3 * 1) / (1 + 1 + 3)
+        self.assertEqual(self.get_aggregate(student).mean, Decimal('2.60'))
+
+        heavy.weight = 1
+        heavy.save()
+        self.assertEqual(self.get_aggregate(student).mean, Decimal('3.67'))
+
+    def test_refresh_upserts(self):
+        self.add_students(2)
+        aggregate = MarkAggregate.objects.first()
+        MarkAggregate.objects.update(count=0)
+        students = list(User.objects.filter(is_teacher=False))
+        # insert (ignored), locked rows, marks, update - in savepoint
+        with self.assertNumQueries(6):
+            MarkAggregate.refresh(students, [self.course])
+        self.assertEqual(
+            MarkAggregate.objects.get(pk=aggregate.pk).count, 2)
+
+    def test_rebuild_command(self):
+        self.add_students(3)
+        MarkAggregate.objects.all().delete()
+        call_command('rebuildmarkaggregates', stdout=StringIO())
+        self.assertEqual(MarkAggregate.objects.count(), 3)
+        self.assertEqual(
+            set(MarkAggregate.objects.values_list('count', flat=True)), {2})
+
+
+class BulkMarkTestCase(LessonTestCase):
+    """ Marks for whole class should be created in constant queries """
+
+    def setUp(self):
+        super().setUp()
+        self.teacher.is_superuser = True
+        self.teacher.save()
+        self.client.force_login(self.teacher)
+
+    def post(self, entries):
+        url = reverse('ajax:mark-create-bulk-lesson',
+                      args=[self.lesson.pk])
+        return self.client.post(url, {'marks': entries},
+                                content_type='application/json')
+
+    def get_entries(self):
+        return [
+            {'student': pk, 'category': self.category.pk,
+             'symbol': self.symbol.pk}
+            for pk in User.objects.filter(is_teacher=False)
+            .values_list('pk', flat=True)
+        ]
+
+    def test_bulk_create(self):
+        self.add_students(20)
+        Mark.objects.all().delete()
+        response = self.post(self.get_entries())
+        self.assertEqual(response.status_code, 200)
+        pks = [mark['pk'] for mark in response.json()['marks']]
+        self.assertEqual(sorted(pks), list(
+            Mark.objects.order_by('pk').values_list('pk', flat=True)))
+        self.assertEqual(
+            ChangeHistory.objects.filter(
+                mark__in=pks, type=ChangeHistory.TYPE_ADD,
+                user=self.teacher).count(), 20)
+        self.assertEqual(MarkAggregate.objects.count(), 20)
+
+    def test_queries(self):
+        self.add_students(3)
+        self.post(self.get_entries())
+        self.add_students(30)
+        entries = self.get_entries()
+        # without pks returned by bulk insert marks are inserted one by
+        # one, history and aggregates are still saved in bulk
+        if connection.features.can_return_rows_from_bulk_insert:
+            inserts = 1
+        else:
+            inserts = len(entries)
+        # session, user, lesson, students, categories, symbols,
+        # marks, history and aggregates refresh (in savepoints)
+        with self.assertNumQueries(15 + inserts):
+            self.post(entries)
+        self.assertEqual(ChangeHistory.objects.count(), 2 * 33 + 3 + 33)
+
+    def test_invalid_student(self):
+        self.add_students(2)
+        outsider = User.objects.create(first_name='Other', last_name='Student')
+        entries = self.get_entries()
+        response = self.post(entries)
+        self.assertEqual(response.status_code, 400)
+        errors = response.json()['errors']
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(errors[0]['field'], 'student')
+        self.assertEqual(entries[errors[0]['index']]['student'], outsider.pk)
+        self.assertEqual(Mark.objects.count(), 4)
+
+
+class MarkChangeTrackingTestCase(LessonTestCase):
+    """ Mark changes should be tracked without loading old instance """
+
+    def setUp(self):
+        super().setUp()
+        self.add_students(1)
+        self.other_symbol = Symbol.objects.create(name='3', value=3)
+
+    def test_history_without_select(self):
+        mark = Mark.objects.first()
+        mark.symbol = self.other_symbol
+        with self.assertNumQueries(0):
+            self.assertEqual(mark.get_original_symbol_id(), self.symbol.pk)
+        mark.save()
+        history = ChangeHistory.objects.get(
+            mark=mark, type=ChangeHistory.TYPE_MODIFY)
+        self.assertEqual(history.value_old, self.symbol)
+        self.assertEqual(history.value_new, self.other_symbol)
+        self.assertEqual(mark.get_original_symbol_id(), self.other_symbol.pk)
+
+    def test_concurrent_modification(self):
+        mark = Mark.objects.first()
+        other = Mark.objects.get(pk=mark.pk)
+        mark.symbol = self.other_symbol
+        mark.expected_date_modified = mark.date_modified
+        mark.save()
+
+        other.expected_date_modified = other.date_modified
+        with self.assertRaises(ConcurrentModificationError):
+            with transaction.atomic():
+                other.save()
+        self.assertEqual(
+            Mark.objects.get(pk=mark.pk).symbol, self.other_symbol)
+
+
+class AttendanceUpdateTestCase(LessonTestCase):
+    """ Changed attendances should be saved with one query """
+
+    def setUp(self):
+        super().setUp()
+        self.add_students(3)
+        self.teacher.is_superuser = True
+        self.teacher.save()
+        self.client.force_login(self.teacher)
+        self.attendances = list(
+            self.lesson.attendances.order_by('student__first_name'))
+
+    def post(self, entries):
+        return self.client.post(
+            reverse('ajax:attendance-update', args=[self.lesson.pk]),
+            json.dumps({'attendances': entries}),
+            content_type='application/json')
+
+    def test_ajax(self):
+        late, absent = Attendance.STATUS_LATE, Attendance.STATUS_ABSENT
+        first, second, third = [a.student_id for a in self.attendances]
+        # session, user, lesson, attendances, UPDATE of attendances and
+        # lesson's counters, savepoints
+        with self.assertNumQueries(10):
+            response = self.post({first: late, second: absent,
+                                  third: Attendance.STATUS_PRESENT})
+        self.assertEqual(response.json(), {
+            'changed': {str(first): late, str(second): absent}})
+        response = self.post({first: late, second: late})
+        self.assertEqual(response.json(), {'changed': {str(second): late}})
+        self.assertEqual(
+            Attendance.objects.get(student=second).status, late)
+
+        self.assertCounts(present=1, late=2, absent=0)
+
+        response = self.post({first: 5, 0: late})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            [error['field'] for error in response.json()['errors']],
+            ['status', 'student'])
+
+    def assertCounts(self, **counts):
+        lesson = Lesson.objects.get(pk=self.lesson.pk)
+        self.assertEqual(lesson.attendance_count, sum(counts.values()))
+        for status, count in counts.items():
+            self.assertEqual(getattr(lesson, status + '_count'), count)
+
+    def test_counts(self):
+        self.assertCounts(present=3, late=0, absent=0)
+        self.lesson.status = Lesson.STATUS_CANCELLED
+        self.lesson.save()
+        self.lesson.sync_attendances()
+        self.assertCounts(present=0, late=0, absent=0)
+
+        Lesson.objects.filter(pk=self.lesson.pk).update(
+            status=Lesson.STATUS_PLANNED, present_count=7)
+        out = StringIO()
+        call_command('repairattendancecounts', stdout=out)
+        self.assertIn('1 lessons repaired', out.getvalue())
+        self.assertCounts(present=0, late=0, absent=0)
+
+    def test_set(self):
+        student = self.attendances[0].student_id
+        url = reverse('ajax:attendance-set', args=[self.lesson.pk, student])
+        late, absent = Attendance.STATUS_LATE, Attendance.STATUS_ABSENT
+        # session, user, locked attendance, UPDATE of attendance and
+        # lesson's counters, savepoints
+        with self.assertNumQueries(7):
+            response = self.client.post(url, {'status': late, 'seq': 10})
+        self.assertEqual(response.json(),
+                         {'status': late, 'changed': True, 'seq': 10})
+        # request sent before the last one is dropped, saved values are
+        # returned
+        response = self.client.post(url, {'status': absent, 'seq': 9})
+        self.assertEqual(response.json(),
+                         {'stale': True, 'status': late, 'seq': 10})
+        response = self.client.post(url, {'status': late, 'seq': 11})
+        self.assertEqual(response.json(),
+                         {'status': late, 'changed': False, 'seq': 11})
+        self.assertEqual(
+            Attendance.objects.get(student=student).status, late)
+
+        # seq isn't stored for other teacher's request
+        other = User.objects.create(
+            first_name='Other', last_name='Teacher', is_teacher=True,
+            is_superuser=True)
+        self.client.force_login(other)
+        response = self.client.post(url, {'status': absent, 'seq': 100})
+        self.assertEqual(response.status_code, 404)
+        self.client.force_login(self.teacher)
+        response = self.client.post(url, {'status': absent, 'seq': 12})
+        self.assertEqual(response.json(),
+                         {'status': absent, 'changed': True, 'seq': 12})
+        # saved seq is rendered with the row, next click continues from it
+        response = self.client.get(
+            reverse('lesson:update', args=[self.lesson.pk]))
+        self.assertContains(response, 'data-seq="12"')
+
+        url = reverse('ajax:attendance-set', args=[self.lesson.pk + 1, 1])
+        response = self.client.post(url, {'status': late})
+        self.assertEqual(response.status_code, 404)
+
+    def test_formset(self):
+        data = {
+            'lesson-subject': 'Test',
+            'attendances-TOTAL_FORMS': 3,
+            'attendances-INITIAL_FORMS': 3,
+        }
+        for index, attendance in enumerate(self.attendances):
+            data['attendances-%i-id' % index] = attendance.pk
+            data['attendances-%i-status' % index] = attendance.status
+        data['attendances-1-status'] = Attendance.STATUS_ABSENT
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post(
+                reverse('lesson:update', args=[self.lesson.pk]), data)
+        updates = [q['sql'] for q in queries.captured_queries
+                   if q['sql'].startswith('UPDATE "records_attendance"')]
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(
+            Attendance.objects.get(pk=self.attendances[1].pk).status,
+            Attendance.STATUS_ABSENT)
+
+        # other lesson's attendance posted instead of this lesson's one
+        other = Attendance.objects.create(
+            lesson=Lesson.objects.create(
+                schedule=self.lesson.schedule,
+                date=self.date + datetime.timedelta(days=7)),
+            student_id=self.attendances[0].student_id)
+        data['attendances-0-id'] = other.pk
+        data['attendances-0-status'] = Attendance.STATUS_LATE
+        response = self.client.post(
+            reverse('lesson:update', args=[self.lesson.pk]), data)
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.context['formset'].is_valid())
+        other.refresh_from_db()
+        self.assertEqual(other.status, Attendance.STATUS_PRESENT)
+
+
+class CourseRegisterTestCase(LessonTestCase):
+    """ Course's register should be built with two queries """
+
+    def test_register(self):
+        self.add_students(3)
+        attendances = self.lesson.attendances.order_by('student__first_name')
+        attendance = attendances[1]
+        attendance.status = Attendance.STATUS_ABSENT
+        save_attendances([attendance])
+        cancelled = Lesson.objects.create(
+            schedule=self.lesson.schedule, date=self.date
+            + datetime.timedelta(days=7), status=Lesson.STATUS_CANCELLED)
+
+        with self.assertNumQueries(2):
+            register = get_course_register(self.course)
+        self.assertEqual([lesson.pk for lesson in register.lessons],
+                         [self.lesson.pk])
+        self.assertEqual(register.lessons[0].absent_count, 1)
+        rows = list(register)
+        self.assertEqual(
+            [row.student.first_name for row in rows],
+            ['Student 000', 'Student 001', 'Student 002'])
+        self.assertEqual(list(rows[1].statuses), [Attendance.STATUS_ABSENT])
+        self.assertEqual((rows[1].absent, rows[1].total), (1, 1))
+        self.assertEqual(register.get_status(0, 0),
+                         Attendance.STATUS_PRESENT)
+
+        register = get_course_register(self.course, date_from=cancelled.date)
+        self.assertEqual((len(register.lessons), len(register)), (0, 0))
+
+
+class GradebookTestCase(LessonTestCase):
+    """ Course's gradebook should be built with two queries """
+
+    def test_gradebook(self):
+        # two marks '5' in category 'Test' for every student
+        self.add_students(2)
+        quiz = Category.objects.create(name='Quiz', weight=3)
+        two = Symbol.objects.create(name='2', value=2)
+        student = User.objects.get(first_name='Student 001')
+        Mark.objects.create(
+            student=student, teacher=self.teacher, course=self.course,
+            category=quiz, symbol=two)
+
+        with self.assertNumQueries(2):
+            gradebook = get_course_gradebook(self.course)
+        self.assertEqual([c.name for c in gradebook.categories],
+                         ['Quiz', 'Test'])
+        self.assertEqual([s.name for s in gradebook.symbols], ['2', '5'])
+        rows = list(gradebook)
+        self.assertEqual(rows[1].cells, [['2'], ['5', '5']])
+        stats = rows[1].stats
+        self.assertEqual(stats.count, 3)
+        self.assertAlmostEqual(stats.mean, 4)
+        self.assertAlmostEqual(stats.weighted_mean, (6 + 10) / 5)
+        self.assertEqual(stats.median, 5)
+        self.assertEqual(list(gradebook.stats.distribution), [1, 4])
+        quiz_stats = gradebook.category_stats[0]
+        self.assertEqual((quiz_stats.count, quiz_stats.median), (1, 2))
+        self.assertEqual(rows[0].stats.count, 2)
+
+    def test_export(self):
+        self.add_students(1)
+        self.teacher.is_superuser = True
+        self.teacher.save()
+        self.client.force_login(self.teacher)
+        response = self.client.get(reverse(
+            'group:course-gradebook-export', args=[self.course.pk]))
+        lines = response.content.decode().splitlines()
+        self.assertEqual(
+            lines, ['last_name,first_name,Test,count,mean,weighted_mean,'
+                    'median', 'Student,Student 000,5 5,2,5.00,5.00,5.00'])
+
+
+class ExportTestCase(LessonTestCase):
+    """ Records should be exported as streamed CSV/JSON lines """
+
+    def test_command(self):
+        self.add_students(2)
+        out = StringIO()
+        call_command('exportrecords', 'attendance', '--group',
+                     str(self.group.pk), stdout=out)
+        lines = out.getvalue().splitlines()
+        self.assertEqual(len(lines), 3)
+        self.assertTrue(lines[0].startswith('id,lesson_id,date,'))
+        self.assertIn('2021-09-06', lines[1])
+
+        out = StringIO()
+        call_command('exportrecords', 'marks', '--date-to', '2000-01-01',
+                     stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 1)
+
+    def test_command_output(self):
+        self.add_students(1)
+        User.objects.filter(is_teacher=False).update(last_name='Żółć')
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        path = os.path.join(tmp_dir.name, 'marks.csv')
+        call_command('exportrecords', 'marks', '--output', path,
+                     stderr=StringIO())
+        with open(path, encoding='utf-8', newline='') as file:
+            rows = list(csv.reader(file))
+        self.assertEqual(len(rows), 3)
+        self.assertIn('Żółć', rows[1])
+
+    def test_view(self):
+        self.add_students(1)
+        self.teacher.is_superuser = True
+        self.teacher.save()
+        self.client.force_login(self.teacher)
+        response = self.client.get(
+            reverse('export:export', args=['marks']),
+            {'format': 'jsonl', 'course': self.course.pk})
+        self.assertEqual(response['Content-Type'], 'application/x-ndjson')
+        rows = b''.join(response.streaming_content).splitlines()
+        self.assertEqual(len(rows), 2)
+
+
+@override_settings(SQL_TIMING_THRESHOLD_MS=0)
+class SQLTimingTestCase(LessonTestCase):
+    """ SQL timing middleware should report queries of request """
+
+    def test_middleware(self):
+        self.teacher.is_superuser = True
+        self.teacher.save()
+        self.client.force_login(self.teacher)
+        url = reverse('schedule:timetable-teacher')
+        with self.modify_settings(MIDDLEWARE={
+                'prepend': 'records.middleware.SQLTimingMiddleware'}):
+            with self.assertLogs('records.middleware', 'WARNING') as logs:
+                response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        header = response['Server-Timing']
+        self.assertRegex(header, r'db;dur=[0-9.]+;desc="[1-9]\d* queries"')
+        self.assertIn('total;dur=', header)
+        self.assertEqual(len(logs.output), 1)
+        self.assertIn('slow_request method=GET path=', logs.output[0])
+        self.assertRegex(logs.output[0], r' queries=[1-9]')
+
+
+@override_settings(
+    PASSWORD_HASHERS=['django.contrib.auth.hashers.MD5PasswordHasher'])
+class StudentImportTestCase(TestCase):
+    """ Students should be imported from CSV, skipping existing ones """
+    csv = (
+        'last_name,first_name,birth_date,email\n'
+        'KOWALSKI,jan,2010-01-02,\n'
+        'Nowak,Anna,2010-03-04,anna@example.com\n'
+        'Nowak,Anna,2010-03-04,\n'
+        'Wiśniewska,Ewa,,\n'
+    )
+
+    def setUp(self):
+        self.existing = User.objects.create(
+            first_name='Jan', last_name='Kowalski',
+            birth_date=datetime.date(2010, 1, 2))
+        self.teacher = User.objects.create(
+            first_name='Adam', last_name='Teacher', is_teacher=True,
+            is_superuser=True)
+
+    def test_command(self):
+        path = os.path.join(self.tmp_dir(), 'students.csv')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(self.csv + 'Zieliński,,,\n')
+        out, err = StringIO(), StringIO()
+        with self.assertRaises(CommandError):
+            call_command('importstudents', path, stdout=out, stderr=err)
+        self.assertIn('Line 6: first_name', err.getvalue())
+
+        call_command('importstudents', path, '--skip-invalid',
+                     '--workers', '2', stdout=out, stderr=err)
+        rows = list(csv.DictReader(StringIO(out.getvalue())))
+        self.assertEqual([row['last_name'] for row in rows],
+                         ['Nowak', 'Wiśniewska'])
+        student = User.objects.get(username=rows[0]['username'])
+        self.assertTrue(student.check_password(rows[0]['password']))
+        self.assertEqual(student.email, 'anna@example.com')
+        self.assertTrue(rows[1]['username'].startswith('ewa.'))
+        self.assertEqual(User.objects.count(), 4)
+
+    def test_command_output(self):
+        tmp_dir = self.tmp_dir()
+        path = os.path.join(tmp_dir, 'students.csv')
+        with open(path, 'w', encoding='utf-8') as file:
+            file.write(self.csv)
+        with self.assertRaises(CommandError):
+            call_command('importstudents', path, '--output',
+                         os.path.join(tmp_dir, 'missing', 'out.csv'),
+                         stderr=StringIO())
+        self.assertEqual(User.objects.count(), 2)
+
+        output = os.path.join(tmp_dir, 'credentials.csv')
+        call_command('importstudents', path, '--output', output,
+                     stderr=StringIO())
+        with open(output, encoding='utf-8', newline='') as file:
+            rows = list(csv.DictReader(file))
+        self.assertEqual(rows[1]['last_name'], 'Wiśniewska')
+        self.assertEqual(User.objects.count(), 4)
+
+    def test_view(self):
+        self.client.force_login(self.teacher)
+        url = reverse('student:import')
+        upload = SimpleUploadedFile('students.csv', self.csv.encode())
+        with self.assertNumQueries(8):
+            response = self.client.post(url, {'file': upload})
+        self.assertEqual(response.status_code, 200)
+        credentials = response.context['credentials']
+        self.assertEqual(len(credentials), 2)
+        self.assertEqual(len(response.context['duplicates']), 2)
+        student, password = credentials[0]
+        self.assertIsNotNone(student.pk)
+        self.assertContains(response, password)
+
+    def tmp_dir(self):
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        return tmp_dir.name
+
+
+class GenerateDataTestCase(TestCase):
+    """ Generated object graph should be complete and consistent """
+
+    def test_generate(self):
+        call_command(
+            'generatedata', '--seed', '1', '--groups', '2', '--teachers', '3',
+            '--students', '6', '--weeks', '2', '--marks', '1',
+            '--date-start', '2021-09-06', stdout=StringIO())
+        self.assertEqual(StudentGroup.objects.count(), 2)
+        self.assertEqual(StudentGroupAssignment.objects.count(), 6)
+        lessons = Lesson.objects.filter(status=Lesson.STATUS_REALIZED)
+        # 5 lessons a day for every group, 2 weeks in the past
+        self.assertEqual(Lesson.objects.count(), 2 * 25 * 2)
+        self.assertEqual(Attendance.objects.count(), lessons.count() * 3)
+        self.assertEqual(Mark.objects.count(), 6 * 8)
+        self.assertEqual(ChangeHistory.objects.count(), 6 * 8)
+        self.assertEqual(
+            sum(MarkAggregate.objects.values_list('count', flat=True)), 6 * 8)
+        for schedule in Schedule.objects.all():
+            schedule.full_clean()
+
+
+class BulkScheduleTestCase(LessonTestCase):
+    """ Schedule entries should be validated together and bulk created """
+
+    def get_schedule(self, period, weeks=1):
+        return Schedule(
+            course=self.course, teacher=self.teacher, period=period,
+            date_start=self.date,
+            date_end=self.date + datetime.timedelta(weeks=weeks))
+
+    def test_bulk_create(self):
+        period = Period.objects.create(
+            time_start=datetime.time(9, 0), time_end=datetime.time(9, 45))
+        schedules = [self.get_schedule(period, weeks=3)]
+        self.assertEqual(bulk_create_schedules(schedules), 4)
+        self.assertIsNotNone(schedules[0].pk)
+        self.assertEqual(schedules[0].lessons.count(), 4)
+
+    def test_collisions(self):
+        period = Period.objects.create(
+            time_start=datetime.time(9, 0), time_end=datetime.time(9, 45))
+        schedules = [
+            # collides with entry created in setUpTestData
+            self.get_schedule(self.lesson.schedule.period),
+            self.get_schedule(period),
+            # collides with previous entry
+            self.get_schedule(period),
+        ]
+        errors = get_schedules_errors(schedules)
+        self.assertEqual(sorted(errors), [0, 2])
+        self.assertEqual(
+            sorted(errors[2].message_dict), ['course', 'teacher'])
+        with self.assertRaises(ValidationError):
+            bulk_create_schedules(schedules)
+        self.assertEqual(Schedule.objects.count(), 1)
+
+    def test_command(self):
+        period = Period.objects.create(
+            time_start=datetime.time(9, 0), time_end=datetime.time(9, 45))
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        path = os.path.join(tmp_dir.name, 'schedules.csv')
+        header = 'course,teacher,period,date_start,date_end\n'
+        row = '%i,%i,%i,%s,%s\n' % (
+            self.course.pk, self.teacher.pk, period.pk, self.date,
+            self.date + datetime.timedelta(weeks=1))
+        invalid = {
+            'course,teacher,period\n1,1,1\n': 'Entry 1: missing',
+            header + row + 'x,1,1,2021-09-06,2021-09-06\n': 'Entry 2:',
+            header + row.replace(str(period.pk), '999', 1):
+                'Entry 1: invalid period 999',
+        }
+        for content, message in invalid.items():
+            with open(path, 'w') as file:
+                file.write(content)
+            with self.assertRaisesMessage(CommandError, message):
+                call_command('importschedules', path, stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command('importschedules', path + '.missing',
+                         '--format', 'csv', stdout=StringIO())
+        self.assertEqual(Schedule.objects.count(), 1)
+
+        with open(path, 'w') as file:
+            file.write(header + row)
+        out = StringIO()
+        call_command('importschedules', path, stdout=out)
+        self.assertIn('1 schedule entries and 2 lessons created',
+                      out.getvalue())
+
+
+class CurrentAssignmentTestCase(LessonTestCase):
+    """ Current assignments should be cached until assignments change """
+
+    def setUp(self):
+        super().setUp()
+        today = datetime.date.today()
+        self.student = User.objects.create(
+            first_name='John', last_name='Student')
+        self.assignment = StudentGroupAssignment.objects.create(
+            student=self.student, group=self.group,
+            date_start=today, date_end=today)
+
+    def get_student(self):
+        return User.objects.get(pk=self.student.pk)
+
+    def test_cached_group(self):
+        self.assertEqual(self.get_student().student_group, self.group)
+        student = self.get_student()
+        with self.assertNumQueries(0):
+            self.assertEqual(student.student_group, self.group)
+
+    def test_invalidation(self):
+        self.assertEqual(self.get_student().student_group, self.group)
+        self.group.name = '1B'
+        self.group.save()
+        self.assertEqual(self.get_student().student_group.name, '1B')
+        self.assignment.delete()
+        self.assertIsNone(self.get_student().student_group)
+
+    def test_bulk_create(self):
+        # student's cached assignment has to be invalidated
+        self.assertEqual(self.get_student().student_group, self.group)
+        self.assignment.delete()
+        self.assertIsNone(self.get_student().student_group)
+        others = [User.objects.create(first_name='Other %i' % i,
+                                      last_name='Student') for i in range(3)]
+        today = datetime.date.today()
+        assignments = [
+            StudentGroupAssignment(
+                student=student, group=self.group,
+                date_start=today, date_end=today)
+            for student in [self.student] + others + others[:1]
+        ]
+        with self.assertNumQueries(1):
+            created, errors = bulk_create_assignments(assignments)
+        self.assertEqual((created, sorted(errors)), ([], [4]))
+
+        created, errors = bulk_create_assignments(
+            assignments, skip_invalid=True)
+        self.assertEqual(len(created), 4)
+        self.assertEqual(self.get_student().student_group, self.group)
+        created, errors = bulk_create_assignments(
+            assignments[:1], skip_invalid=True)
+        self.assertEqual((created, sorted(errors)), ([], [0]))
+
+    def test_prefetch(self):
+        students = list(User.objects.filter(is_teacher=False))
+        with self.assertNumQueries(1):
+            prefetch_current_assignments(students)
+        with self.assertNumQueries(0):
+            self.assertEqual(students[0].student_group, self.group)
+
+
+class StudentSearchTestCase(TestCase):
+    """ Students should be searched by name prefixes """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.jan = User.objects.create(first_name='Jan', last_name='Kowalski')
+        cls.anna = User.objects.create(first_name='Anna', last_name='Nowak')
+
+    def search(self, term):
+        return list(search_users(User.objects.all(), term))
+
+    def test_search(self):
+        self.assertEqual(self.search('kow'), [self.jan])
+        self.assertEqual(self.search('ANN'), [self.anna])
+        self.assertEqual(self.search('jan kowal'), [self.jan])
+        self.assertEqual(self.search('kowal j'), [self.jan])
+        self.assertEqual(self.search('nowak jan'), [])
+        self.assertEqual(self.search(''), [self.jan, self.anna])
+
+    def test_search_non_ascii(self):
+        lukasz = User.objects.create(first_name='Łukasz', last_name='Wójcik')
+        for term in ['wój', 'Wój', 'WÓJ', 'łuk', 'wójcik ŁUKASZ']:
+            self.assertEqual(self.search(term), [lukasz], term)
+        # names changed with update_fields are normalised too
+        lukasz.last_name = 'Żak'
+        lukasz.save(update_fields=['last_name'])
+        self.assertEqual(self.search('ŻA'), [lukasz])
+
+    def test_view(self):
+        teacher = User.objects.create(
+            first_name='John', last_name='Teacher', is_teacher=True,
+            is_superuser=True)
+        self.client.force_login(teacher)
+        response = self.client.get(
+            reverse('ajax:student-search'), {'term': 'kowalski'})
+        self.assertEqual(response.json(), {
+            'results': [{'id': self.jan.pk, 'text': 'Kowalski Jan'}],
+            'pagination': {'more': False},
+        })
+
+    def test_widget_renders_selected_only(self):
+        form = AssignManyToGroupForm(initial={'students_to_add': [self.jan]})
+        html = str(form['students_to_add'])
+        self.assertIn('Kowalski Jan', html)
+        self.assertNotIn('Nowak Anna', html)
+
+
+class KeysetPaginationTestCase(LessonTestCase):
+    """ Lists should be paginated with cursors in both directions """
+
+    def setUp(self):
+        super().setUp()
+        self.teacher.is_superuser = True
+        self.teacher.save()
+        self.client.force_login(self.teacher)
+
+    def get_page(self, **params):
+        response = self.client.get(reverse('student:list'), params)
+        return response.context['page_obj']
+
+    def test_student_list(self):
+        for i in range(45):
+            # same names, so pk decides about order
+            User.objects.create(first_name='Student', last_name='Student')
+        students = list(User.objects.filter(is_teacher=False)
+                        .order_by('last_name', 'first_name', 'pk'))
+        pages = [self.get_page()]
+        while pages[-1].has_next():
+            pages.append(self.get_page(after=pages[-1].next_cursor))
+        self.assertEqual([len(page) for page in pages], [20, 20, 5])
+        self.assertEqual(
+            [s for page in pages for s in page.object_list], students)
+        self.assertEqual(pages[0].count, 45)
+
+        previous = self.get_page(before=pages[2].previous_cursor)
+        self.assertEqual(previous.object_list, pages[1].object_list)
+        self.assertTrue(previous.has_previous())
+        first = self.get_page(before=previous.previous_cursor)
+        self.assertEqual(first.object_list, pages[0].object_list)
+        self.assertFalse(first.has_previous())
+
+    def test_invalid_cursor(self):
+        response = self.client.get(reverse('student:list'), {'after': 'x'})
+        self.assertEqual(response.status_code, 404)
+
+    def test_lesson_list_without_count(self):
+        response = self.client.get(reverse('lesson:unrealized'))
+        self.assertEqual(list(response.context['lessons']), [self.lesson])
+        self.assertIsNone(response.context['page_obj'].count)
+
+
+class TimetableCacheTestCase(LessonTestCase):
+    """ Cached timetables should be invalidated by related changes """
+
+    def get_timetable(self, date=None):
+        timetable = get_cached_group_timetable(
+            get_week_dates(date or self.date), self.group)
+        return [lesson for lessons in timetable.values()
+                for lesson in lessons if lesson]
+
+    def test_cached(self):
+        self.get_timetable()
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_timetable(), [self.lesson])
+        with self.assertNumQueries(0):
+            timetable = get_cached_group_timetable([self.date], self.group)
+        self.assertEqual(list(timetable.values()), [[self.lesson]])
+
+    def test_lesson_invalidation(self):
+        self.get_timetable()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lesson.status = Lesson.STATUS_CANCELLED
+            self.lesson.save()
+        self.assertTrue(self.get_timetable()[0].is_cancelled)
+
+    def test_schedule_invalidation(self):
+        self.get_timetable()
+        schedule = self.lesson.schedule
+        with self.captureOnCommitCallbacks(execute=True):
+            schedule.date_start += datetime.timedelta(weeks=1)
+            schedule.date_end += datetime.timedelta(weeks=1)
+            schedule.save()
+        self.assertEqual(self.get_timetable(), [])
+
+    def test_rollover_term(self):
+        next_week = self.date + datetime.timedelta(weeks=1)
+        self.assertEqual(self.get_timetable(next_week), [])
+
+        def rollover(weeks):
+            out = StringIO()
+            with self.captureOnCommitCallbacks(execute=True):
+                call_command(
+                    'rolloverterm', '--active-on', str(self.date),
+                    '--date-end',
+                    str(self.date + datetime.timedelta(weeks=weeks)),
+                    stdout=out)
+            return out.getvalue()
+
+        self.assertIn('2 lessons created, 0 deleted', rollover(2))
+        self.assertEqual(
+            list(self.lesson.schedule.lessons.order_by('date')
+                 .values_list('date', flat=True)),
+            [self.date, next_week, self.date + datetime.timedelta(weeks=2)])
+        # cached timetable of next week was invalidated
+        self.assertEqual(
+            [lesson.date for lesson in self.get_timetable(next_week)],
+            [next_week])
+
+        self.assertIn('0 lessons created, 1 deleted', rollover(1))
+        Lesson.objects.filter(date=next_week).update(
+            status=Lesson.STATUS_REALIZED)
+        with self.assertRaisesMessage(CommandError, 'realized lessons'):
+            rollover(0)
+        self.assertEqual(self.lesson.schedule.lessons.count(), 2)
+
+    def test_period_invalidation(self):
+        self.get_timetable()
+        with self.captureOnCommitCallbacks(execute=True):
+            Period.objects.create(
+                time_start=datetime.time(9, 0),
+                time_end=datetime.time(9, 45))
+        timetable = get_cached_group_timetable([self.date], self.group)
+        self.assertEqual(len(timetable), 2)
+
+    def test_warm_command(self):
+        with self.assertRaisesMessage(CommandError, 'Local memory cache'):
+            call_command('warmdashboards', stdout=StringIO())
+        tmp_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp_dir.cleanup)
+        with override_settings(CACHES={'default': {
+                'BACKEND': 'django.core.cache.backends.filebased.'
+                           'FileBasedCache',
+                'LOCATION': tmp_dir.name}}):
+            out = StringIO()
+            call_command('warmdashboards', stdout=out)
+        self.assertIn('Dashboards of 1 teachers cached', out.getvalue())
+
+    def test_dashboard(self):
+        warm_teacher_dashboards([self.teacher])
+        with self.assertNumQueries(0):
+            dashboard = get_teacher_dashboard(self.teacher)
+        self.assertEqual(dashboard['unrealized_count'], 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.lesson.status = Lesson.STATUS_REALIZED
+            self.lesson.save()
+        dashboard = get_teacher_dashboard(self.teacher)
+        self.assertEqual(dashboard['unrealized_count'], 0)
+
+
+class ViewBudgetTestCase(TestCase):
+    """
+    Main views are requested with generated data set and their query
+    count and wall time (best of few cold cache runs) compared with
+    budgets checked in to view_budgets.json. Set VIEW_BUDGETS_REPORT
+    environment variable to print measured values.
+    """
+    budgets_path = os.path.join(
+        os.path.dirname(__file__), 'view_budgets.json')
+    runs = 3
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command(
+            'generatedata', '--seed', '1', '--groups', '2', '--teachers', '4',
+            '--students', '60', '--weeks', '4', '--marks', '3',
+            '--date-start', '2021-09-06', stdout=StringIO())
+        lesson = Lesson.objects\
+            .filter(status=Lesson.STATUS_REALIZED)\
+            .select_related('schedule__course__group', 'schedule__teacher')\
+            .order_by('date', 'pk')\
+            .first()
+        cls.lesson = lesson
+        cls.group = lesson.schedule.course.group
+        cls.teacher = lesson.schedule.teacher
+        cls.teacher.is_superuser = True
+        cls.teacher.save()
+        cls.student = cls.group.get_all_students().first()
+
+    def get_urls(self):
+        date = str(self.lesson.date)
+        return {
+            'timetable-teacher': reverse(
+                'schedule:timetable-teacher-specified',
+                args=[self.teacher.pk, date, 1]),
+            'timetable-group': reverse(
+                'schedule:timetable-group-specified',
+                args=[self.group.pk, date, 1]),
+            'lesson-update': reverse('lesson:update', args=[self.lesson.pk]),
+            'lesson-marks': reverse('lesson:marks', args=[self.lesson.pk]),
+            'student-marks': reverse('student:marks', args=[self.student.pk]),
+            'group-assignments': reverse(
+                'group:assignments', args=[self.group.pk]),
+            'dashboard': reverse('dashboard:teacher'),
+            'course-register': reverse(
+                'group:course-register',
+                args=[self.lesson.schedule.course_id]),
+            'course-gradebook': reverse(
+                'group:course-gradebook',
+                args=[self.lesson.schedule.course_id]),
+        }
+
+    def measure(self, url):
+        """ Return tuple (query count, best wall time) of GET request """
+        queries, seconds = None, None
+        for _ in range(self.runs):
+            cache.clear()
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                response = self.client.get(url)
+                elapsed = time.perf_counter() - start
+            self.assertEqual(response.status_code, 200, url)
+            queries = len(context.captured_queries)
+            seconds = elapsed if seconds is None else min(seconds, elapsed)
+        return queries, seconds
+
+    def test_budgets(self):
+        with open(self.budgets_path) as file:
+            budgets = json.load(file)
+        self.client.force_login(self.teacher)
+        report = []
+        for name, url in self.get_urls().items():
+            queries, seconds = self.measure(url)
+            report.append(
+                '%-20s %4i queries %8.4fs' % (name, queries, seconds))
+            with self.subTest(view=name):
+                budget = budgets[name]
+                self.assertLessEqual(queries, budget['queries'])
+                self.assertLessEqual(seconds, budget['seconds'])
+        if os.environ.get('VIEW_BUDGETS_REPORT'):
+            print('\n' + '\n'.join(report))
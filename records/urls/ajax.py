@@ -1,5 +1,7 @@
 from django.urls import path
+from records.views.ajax import attendance as attendance_views
 from records.views.ajax import mark as mark_views
+from records.views.ajax import student as student_views
 
 app_name = 'ajax'
 urlpatterns = [
@@ -12,4 +14,22 @@ urlpatterns = [
     path('mark-create/lesson/<lesson>/',
          mark_views.MarkCreateView.as_view(),
          name="mark-create-lesson"),
+    path('mark-create/course/<course>/',
+         mark_views.MarkCreateView.as_view(),
+         name="mark-create-course"),
+    path('mark-create-bulk/lesson/<lesson>/',
+         mark_views.MarkBulkCreateView.as_view(),
+         name="mark-create-bulk-lesson"),
+    path('mark-create-bulk/course/<course>/',
+         mark_views.MarkBulkCreateView.as_view(),
+         name="mark-create-bulk-course"),
+    path('attendance-update/<lesson>/',
+         attendance_views.AttendanceBulkUpdateView.as_view(),
+         name="attendance-update"),
+    path('attendance-set/<int:lesson>/<int:student>/',
+         attendance_views.AttendanceSetView.as_view(),
+         name="attendance-set"),
+    path('student-search/',
+         student_views.StudentSearchView.as_view(),
+         name="student-search"),
 ]
@@ -0,0 +1,9 @@
+from django.urls import path
+from records.views import export as export_views
+
+app_name = 'export'
+urlpatterns = [
+    path('<name>/',
+         export_views.ExportView.as_view(),
+         name='export'),
+]
@@ -33,6 +33,15 @@ urlpatterns = [
     path('course/<pk>/',
          group_views.CourseUpdateView.as_view(),
          name='course-update'),
+    path('course/<pk>/register/',
+         group_views.CourseRegisterView.as_view(),
+         name='course-register'),
+    path('course/<pk>/gradebook/',
+         group_views.CourseGradebookView.as_view(),
+         name='course-gradebook'),
+    path('course/<pk>/gradebook/export/',
+         group_views.CourseGradebookExportView.as_view(),
+         name='course-gradebook-export'),
     path('<pk>/schedule/',
          group_views.GroupScheduleView.as_view(),
          name='schedule'),
@@ -9,6 +9,9 @@ urlpatterns = [
     path('new/',
          student_views.StudentCreateView.as_view(),
          name='create'),
+    path('import/',
+         student_views.StudentImportView.as_view(),
+         name='import'),
     path('<pk>/',
          student_views.StudentDetailView.as_view(),
          name='detail'),
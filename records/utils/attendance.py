@@ -0,0 +1,237 @@
+from array import array
+from collections import namedtuple
+from django.db import transaction
+from django.db.models import Count, Q
+from records.models import Attendance, Lesson
+import datetime
+
+
+def get_lesson_attendances(lesson):
+    """
+    Return dict with student's pk as key and Lesson's Attendance as item.
+    Attendances are fetched without default ordering, so without joins.
+    """
+    attendances = lesson.attendances.order_by()
+    return {attendance.student_id: attendance for attendance in attendances}
+
+
+def save_attendances(attendances):
+    """
+    Write statuses of attendances with one UPDATE query and update
+    counters of their lessons in the same transaction.
+    """
+    if attendances:
+        with transaction.atomic():
+            Attendance.objects.bulk_update(attendances, ['status'])
+            Lesson.update_attendance_counts(
+                {attendance.lesson_id for attendance in attendances})
+
+
+def update_attendances(attendances, statuses):
+    """
+    Set statuses (dict with student's pk as key) of attendances (dict
+    returned by get_lesson_attendances()). Unchanged rows are skipped,
+    changed ones are written with one query.
+    Return list of changed Attendances.
+    """
+    changed = []
+    for student_pk, status in statuses.items():
+        attendance = attendances[student_pk]
+        if attendance.status != status:
+            attendance.status = status
+            changed.append(attendance)
+    save_attendances(changed)
+    return changed
+
+
+def get_teacher_attendances(teacher):
+    """ Return Attendances of past/today lessons taught by teacher """
+    return Attendance.objects.filter(
+        lesson__schedule__teacher=teacher,
+        lesson__date__lte=datetime.date.today(),
+    )
+
+
+def set_attendance_status(teacher, lesson_pk, student_pk, status, seq=None):
+    """
+    Set status of student's attendance in lesson taught by teacher.
+    'seq' is number sent by client with every click, greater than the
+    last saved one (rendered with the row) - if request with greater or
+    equal number was already saved, nothing is written, so earlier clicks
+    arriving late (or clicks on outdated page) don't overwrite the last
+    status. The row is locked while seq is compared, it's written only if
+    status or seq changes.
+    Return tuple (changed, saved status, saved seq), 'changed' is None
+    if request is stale. Raise Attendance.DoesNotExist if teacher's
+    attendance isn't found.
+    """
+    owned = get_teacher_attendances(teacher)\
+        .filter(lesson=lesson_pk, student=student_pk)\
+        .values('pk')
+    with transaction.atomic():
+        # subquery, so only attendance row is locked, not joined ones
+        attendance = Attendance.objects\
+            .select_for_update()\
+            .filter(pk__in=owned)\
+            .values('pk', 'status', 'seq')\
+            .order_by()\
+            .first()
+        if attendance is None:
+            raise Attendance.DoesNotExist
+        if seq is not None and seq <= attendance['seq']:
+            return None, attendance['status'], attendance['seq']
+
+        changed = attendance['status'] != status
+        values = {'status': status}
+        if seq is not None:
+            values['seq'] = seq
+        if changed or seq is not None:
+            Attendance.objects.filter(pk=attendance['pk']).update(**values)
+        if changed:
+            Lesson.update_attendance_counts([lesson_pk])
+    return changed, status, values.get('seq', attendance['seq'])
+
+
+def get_attendance_counts():
+    """
+    Return dict with Lesson's pk as key and tuple of its attendance
+    counters (in order of Lesson.ATTENDANCE_COUNT_FIELDS) as item.
+    All attendances are aggregated with one GROUP BY query.
+    """
+    counts = {}
+    for field, status in Lesson.ATTENDANCE_COUNT_FIELDS.items():
+        if status is None:
+            counts[field] = Count('pk')
+        else:
+            counts[field] = Count('pk', filter=Q(status=status))
+    rows = Attendance.objects\
+        .order_by()\
+        .values('lesson')\
+        .annotate(**counts)\
+        .values_list('lesson', *counts)
+    return {row[0]: row[1:] for row in rows}
+
+
+def repair_attendance_counts(batch_size=1000, dry_run=False):
+    """
+    Recompute attendance counters of all lessons (see
+    get_attendance_counts()) and write the ones which differ with
+    bulk_update. Return number of lessons with wrong counters.
+    """
+    fields = list(Lesson.ATTENDANCE_COUNT_FIELDS)
+    empty = (0,) * len(fields)
+    counts = get_attendance_counts()
+    wrong = []
+    lessons = Lesson.objects\
+        .order_by()\
+        .values_list('pk', *fields)\
+        .iterator(chunk_size=batch_size)
+    for pk, *stored in lessons:
+        actual = counts.get(pk, empty)
+        if tuple(stored) != actual:
+            wrong.append(Lesson(pk=pk, **dict(zip(fields, actual))))
+    if wrong and not dry_run:
+        Lesson.objects.bulk_update(wrong, fields, batch_size=batch_size)
+    return len(wrong)
+
+
+RegisterLesson = namedtuple('RegisterLesson', [
+    'pk', 'date', 'time_start', *Lesson.ATTENDANCE_COUNT_FIELDS])
+RegisterStudent = namedtuple('RegisterStudent', [
+    'pk', 'last_name', 'first_name'])
+RegisterRow = namedtuple('RegisterRow', [
+    'student', 'statuses', 'present', 'late', 'absent', 'total'])
+
+
+class CourseRegister:
+    """
+    Attendance matrix of students (rows) and lessons (columns).
+    Statuses are stored in flat array of bytes: status of students[i]
+    in lessons[j] is statuses[i * len(lessons) + j] - NO_ATTENDANCE if
+    student has no attendance in the lesson (e.g. wasn't assigned to the
+    group yet). Per-student totals are stored in flat array as well:
+    number of attendances with status S of students[i] is
+    totals[i * STATUS_COUNT + S]. Per-lesson totals are lessons'
+    attendance counters.
+    """
+    NO_ATTENDANCE = -1
+    STATUS_COUNT = len(Attendance.STATUS_CHOICES)
+
+    def __init__(self, lessons, students):
+        self.lessons = lessons
+        self.students = students
+        self.statuses = array('b', [self.NO_ATTENDANCE]) \
+            * (len(students) * len(lessons))
+        self.totals = array('l', [0]) * (len(students) * self.STATUS_COUNT)
+
+    def set_status(self, row, column, status):
+        self.statuses[row * len(self.lessons) + column] = status
+        self.totals[row * self.STATUS_COUNT + status] += 1
+
+    def get_status(self, row, column):
+        return self.statuses[row * len(self.lessons) + column]
+
+    def __iter__(self):
+        """ Yield RegisterRow of every student """
+        width = len(self.lessons)
+        for row, student in enumerate(self.students):
+            present, late, absent = self.totals[
+                row * self.STATUS_COUNT:(row + 1) * self.STATUS_COUNT]
+            yield RegisterRow(
+                student, self.statuses[row * width:(row + 1) * width],
+                present, late, absent, present + late + absent)
+
+    def __len__(self):
+        return len(self.students)
+
+
+def get_course_register(course, date_from=None, date_to=None):
+    """
+    Return CourseRegister of course's past (and today's) lessons, not
+    cancelled, optionally limited to dates range (inclusive).
+    Students are the ones with attendance in any of these lessons.
+    Uses two queries - lessons and all their attendances (with students'
+    names) as tuples, pivoted in memory. Attendances aren't synced.
+    """
+    lessons = Lesson.objects\
+        .filter(schedule__course=course, date__lte=datetime.date.today())\
+        .exclude(status=Lesson.STATUS_CANCELLED)
+    if date_from is not None:
+        lessons = lessons.filter(date__gte=date_from)
+    if date_to is not None:
+        lessons = lessons.filter(date__lte=date_to)
+
+    register_lessons = [
+        RegisterLesson(*row) for row in lessons
+        .order_by('date', 'schedule__period__time_start', 'pk')
+        .values_list('pk', 'date', 'schedule__period__time_start',
+                     *Lesson.ATTENDANCE_COUNT_FIELDS)
+    ]
+    columns = {lesson.pk: column
+               for column, lesson in enumerate(register_lessons)}
+
+    attendances = Attendance.objects\
+        .filter(lesson__in=lessons.values('pk'))\
+        .order_by()\
+        .values_list('student', 'student__last_name', 'student__first_name',
+                     'lesson', 'status')
+    students = {}
+    cells = []
+    for student_pk, last_name, first_name, lesson_pk, status in attendances:
+        if lesson_pk not in columns:
+            # lesson created after the first query
+            continue
+        if student_pk not in students:
+            students[student_pk] = RegisterStudent(
+                student_pk, last_name, first_name)
+        cells.append((student_pk, columns[lesson_pk], status))
+
+    register_students = sorted(
+        students.values(),
+        key=lambda student: (student.last_name, student.first_name,
+                             student.pk))
+    rows = {student.pk: row for row, student in enumerate(register_students)}
+    register = CourseRegister(register_lessons, register_students)
+    for student_pk, column, status in cells:
+        register.set_status(rows[student_pk], column, status)
+    return register
@@ -0,0 +1,19 @@
+from django.core.cache import cache
+import time
+
+
+def get_cache_version(key):
+    """
+    Return cache version stored under key. New versions start from
+    current time, so if version is evicted from cache, entries cached
+    under any older version won't be used again.
+    """
+    return cache.get_or_set(key, time.time_ns, None)
+
+
+def bump_cache_version(key):
+    """ Increment cache version stored under key """
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, time.time_ns(), None)
@@ -0,0 +1,154 @@
+from django.core.serializers.json import DjangoJSONEncoder
+from records.models import Mark, Attendance, Lesson
+import csv
+
+# every export: model, permission needed to download it in view,
+# (column name, lookup) pairs and lookups used by filters - rows are
+# fetched as tuples, no model instances are built
+EXPORTS = {
+    'marks': {
+        'model': Mark,
+        'permission': 'records.view_mark',
+        'columns': [
+            ('id', 'pk'),
+            ('student_id', 'student_id'),
+            ('student_last_name', 'student__last_name'),
+            ('student_first_name', 'student__first_name'),
+            ('group', 'course__group__name'),
+            ('course_id', 'course_id'),
+            ('course', 'course__name'),
+            ('category', 'category__name'),
+            ('symbol', 'symbol__name'),
+            ('value', 'symbol__value'),
+            ('teacher_id', 'teacher_id'),
+            ('date_created', 'date_created'),
+            ('date_modified', 'date_modified'),
+        ],
+        'filters': {
+            'group': 'course__group',
+            'course': 'course',
+            'date': 'date_created__date',
+        },
+    },
+    'attendance': {
+        'model': Attendance,
+        'permission': 'records.view_attendance',
+        'columns': [
+            ('id', 'pk'),
+            ('lesson_id', 'lesson_id'),
+            ('date', 'lesson__date'),
+            ('student_id', 'student_id'),
+            ('student_last_name', 'student__last_name'),
+            ('student_first_name', 'student__first_name'),
+            ('group', 'lesson__schedule__course__group__name'),
+            ('course_id', 'lesson__schedule__course_id'),
+            ('course', 'lesson__schedule__course__name'),
+            ('status', 'status'),
+        ],
+        'filters': {
+            'group': 'lesson__schedule__course__group',
+            'course': 'lesson__schedule__course',
+            'date': 'lesson__date',
+        },
+    },
+    'lessons': {
+        'model': Lesson,
+        'permission': 'records.view_lesson',
+        'columns': [
+            ('id', 'pk'),
+            ('date', 'date'),
+            ('period_id', 'schedule__period_id'),
+            ('group', 'schedule__course__group__name'),
+            ('course_id', 'schedule__course_id'),
+            ('course', 'schedule__course__name'),
+            ('teacher_id', 'schedule__teacher_id'),
+            ('status', 'status'),
+            ('subject', 'subject'),
+        ],
+        'filters': {
+            'group': 'schedule__course__group',
+            'course': 'schedule__course',
+            'date': 'date',
+        },
+    },
+}
+
+
+def get_export_queryset(name, group=None, course=None, date_from=None,
+                        date_to=None):
+    """
+    Return values_list queryset of export's columns, ordered by pk.
+    Optionally filtered by group, course (instances or pks)
+    and date range (inclusive).
+    """
+    export = EXPORTS[name]
+    filters = export['filters']
+    lookups = {}
+    if group is not None:
+        lookups[filters['group']] = group
+    if course is not None:
+        lookups[filters['course']] = course
+    if date_from is not None:
+        lookups[filters['date'] + '__gte'] = date_from
+    if date_to is not None:
+        lookups[filters['date'] + '__lte'] = date_to
+    return export['model'].objects\
+        .filter(**lookups)\
+        .order_by('pk')\
+        .values_list(*[lookup for _, lookup in export['columns']])
+
+
+def get_export_header(name):
+    return [column for column, _ in EXPORTS[name]['columns']]
+
+
+class Echo:
+    """ File-like object returning written value, used by csv.writer """
+
+    def write(self, value):
+        return value
+
+
+def iter_csv(name, queryset, chunk_size=2000):
+    """ Yield CSV lines (with header) of export queryset's rows """
+    writer = csv.writer(Echo())
+    yield writer.writerow(get_export_header(name))
+    for row in queryset.iterator(chunk_size=chunk_size):
+        yield writer.writerow(row)
+
+
+def iter_jsonl(name, queryset, chunk_size=2000):
+    """ Yield JSON lines (object per row) of export queryset's rows """
+    header = get_export_header(name)
+    encoder = DjangoJSONEncoder()
+    for row in queryset.iterator(chunk_size=chunk_size):
+        yield encoder.encode(dict(zip(header, row))) + '\n'
+
+
+def format_number(value):
+    return '' if value is None else '%.2f' % value
+
+
+def iter_gradebook_csv(gradebook):
+    """
+    Yield CSV lines of Gradebook: row per student with marks in every
+    category (separated with spaces) and student's statistics
+    """
+    writer = csv.writer(Echo())
+    yield writer.writerow(
+        ['last_name', 'first_name']
+        + [category.name for category in gradebook.categories]
+        + ['count', 'mean', 'weighted_mean', 'median'])
+    for student, cells, stats in gradebook:
+        yield writer.writerow(
+            [student.last_name, student.first_name]
+            + [' '.join(names) for names in cells]
+            + [stats.count, format_number(stats.mean),
+               format_number(stats.weighted_mean),
+               format_number(stats.median)])
+
+
+EXPORT_FORMATS = {
+    'csv': (iter_csv, 'text/csv'),
+    'jsonl': (iter_jsonl, 'application/x-ndjson'),
+}
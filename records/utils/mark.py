@@ -0,0 +1,233 @@
+from array import array
+from collections import OrderedDict, namedtuple
+from django.db import connection, transaction
+from operator import mul
+from records.models import (
+    Attendance, Mark, ChangeHistory, MarkAggregate, User
+)
+import datetime
+import statistics
+
+
+def get_grade_sheet(lesson):
+    """
+    Return OrderedDict with students attending the lesson as keys
+    and dicts {'marks': list of student's Marks in lesson's course,
+    'absent': bool, 'aggregate': student's MarkAggregate or None} as
+    items. Uses three queries regardless of number of students -
+    attendances with students, all course's marks and aggregates of
+    these students, grouped in memory.
+    """
+    students = OrderedDict()
+    attendances = Attendance.objects\
+        .filter(lesson=lesson)\
+        .select_related('student')
+    marks_by_student = {}
+    for attendance in attendances:
+        marks_by_student[attendance.student_id] = []
+        students[attendance.student] = {
+            'marks': marks_by_student[attendance.student_id],
+            'absent': attendance.status == Attendance.STATUS_ABSENT,
+            'aggregate': None,
+        }
+
+    if marks_by_student:
+        marks = Mark.objects\
+            .filter(course=lesson.schedule.course_id,
+                    student__in=marks_by_student.keys())\
+            .order_by('date_created')\
+            .select_related('symbol')
+        for mark in marks:
+            marks_by_student[mark.student_id].append(mark)
+        aggregates = MarkAggregate.objects.filter(
+            course=lesson.schedule.course_id,
+            student__in=marks_by_student.keys())
+        aggregates = {a.student_id: a for a in aggregates}
+        for student, data in students.items():
+            data['aggregate'] = aggregates.get(student.pk)
+    return students
+
+
+def bulk_create_marks(marks, user=None):
+    """
+    Insert unsaved Marks with bulk_create, together with their 'add'
+    ChangeHistory rows, and refresh affected MarkAggregates.
+    Signals aren't handled, so history and aggregates are saved here
+    with a constant number of queries. Sets pks on provided instances.
+    Backends which don't return pks of bulk inserted rows (e.g. SQLite)
+    insert marks one by one, without signal handlers' work.
+    """
+    marks = list(marks)
+    if not marks:
+        return marks
+
+    with transaction.atomic():
+        if connection.features.can_return_rows_from_bulk_insert:
+            Mark.objects.bulk_create(marks)
+        else:
+            for mark in marks:
+                mark.batched = True
+                mark.save(force_insert=True)
+                mark.batched = False
+        ChangeHistory.objects.bulk_create([
+            ChangeHistory(
+                mark=mark,
+                type=ChangeHistory.TYPE_ADD,
+                user=user or mark.teacher,
+                value_new_id=mark.symbol_id
+            ) for mark in marks
+        ])
+        MarkAggregate.refresh(
+            {mark.student_id for mark in marks},
+            {mark.course_id for mark in marks}
+        )
+    return marks
+
+
+GradebookStudent = namedtuple('GradebookStudent', [
+    'pk', 'last_name', 'first_name'])
+GradebookCategory = namedtuple('GradebookCategory', ['pk', 'name', 'weight'])
+GradebookSymbol = namedtuple('GradebookSymbol', ['pk', 'name', 'value'])
+GradebookRow = namedtuple('GradebookRow', ['student', 'cells', 'stats'])
+MarkStats = namedtuple('MarkStats', [
+    'count', 'mean', 'weighted_mean', 'median', 'distribution'])
+
+
+class Gradebook:
+    """
+    Marks of students in a course, pivoted by category.
+    Marks are stored column-wise in flat arrays: student's row,
+    category's column, symbol's index, value and category weight of
+    every mark. Statistics are computed over these arrays, without
+    model instances:
+        - student_stats[i] - MarkStats of students[i]
+        - category_stats[j] - MarkStats of categories[j]
+        - stats - MarkStats of all marks
+    MarkStats.distribution is array of marks' counts by symbol (in order
+    of 'symbols'). Means and median are None if there are no marks.
+    Names of symbols of students[i] in categories[j] (ordered by date)
+    are stored in cells[i * len(categories) + j].
+    """
+
+    def __init__(self, students, categories, symbols):
+        self.students = students
+        self.categories = categories
+        self.symbols = symbols
+        self.rows = array('l')
+        self.columns = array('l')
+        self.symbol_indexes = array('l')
+        self.values = array('d')
+        self.weights = array('d')
+
+    def add_mark(self, row, column, symbol_index):
+        self.rows.append(row)
+        self.columns.append(column)
+        self.symbol_indexes.append(symbol_index)
+        self.values.append(float(self.symbols[symbol_index].value))
+        self.weights.append(float(self.categories[column].weight))
+
+    def get_stats(self, indexes):
+        """ Return MarkStats of marks with provided indexes """
+        distribution = array('l', [0]) * len(self.symbols)
+        for symbol_index in map(self.symbol_indexes.__getitem__, indexes):
+            distribution[symbol_index] += 1
+        if not indexes:
+            return MarkStats(0, None, None, None, distribution)
+
+        values = array('d', map(self.values.__getitem__, indexes))
+        weights = array('d', map(self.weights.__getitem__, indexes))
+        weights_sum = sum(weights)
+        weighted_mean = sum(map(mul, values, weights)) / weights_sum \
+            if weights_sum else None
+        return MarkStats(len(values), statistics.fmean(values),
+                         weighted_mean, statistics.median(values),
+                         distribution)
+
+    def compute(self):
+        """ Group marks by student and category, compute statistics """
+        width = len(self.categories)
+        by_student = [[] for _ in self.students]
+        by_category = [[] for _ in self.categories]
+        self.cells = [[] for _ in range(len(self.students) * width)]
+        for index, (row, column, symbol_index) in enumerate(
+                zip(self.rows, self.columns, self.symbol_indexes)):
+            by_student[row].append(index)
+            by_category[column].append(index)
+            self.cells[row * width + column].append(
+                self.symbols[symbol_index].name)
+        self.student_stats = [self.get_stats(i) for i in by_student]
+        self.category_stats = [self.get_stats(i) for i in by_category]
+        self.stats = self.get_stats(range(len(self.values)))
+
+    def __iter__(self):
+        """ Yield GradebookRow of every student """
+        width = len(self.categories)
+        for row, student in enumerate(self.students):
+            yield GradebookRow(
+                student, self.cells[row * width:(row + 1) * width],
+                self.student_stats[row])
+
+    def iter_categories(self):
+        """ Yield tuple (category, MarkStats) of every category """
+        return zip(self.categories, self.category_stats)
+
+    def __len__(self):
+        return len(self.students)
+
+
+def get_course_gradebook(course):
+    """
+    Return Gradebook of course's marks. Rows are students currently
+    assigned to course's group and other students with marks in the
+    course, columns are categories used in the course.
+    Uses two queries - all course's marks (with names of students,
+    categories and symbols) as tuples and current students.
+    """
+    marks = Mark.objects\
+        .filter(course=course)\
+        .order_by('date_created', 'pk')\
+        .values_list('student', 'student__last_name', 'student__first_name',
+                     'category', 'category__name', 'category__weight',
+                     'symbol', 'symbol__name', 'symbol__value')
+    today = datetime.date.today()
+    current_students = User.objects\
+        .filter(assignments__group=course.group_id,
+                assignments__date_start__lte=today,
+                assignments__date_end__gte=today)\
+        .order_by()\
+        .values_list('pk', 'last_name', 'first_name')
+
+    students = {pk: GradebookStudent(pk, last_name, first_name)
+                for pk, last_name, first_name in current_students}
+    categories = {}
+    symbols = {}
+    entries = []
+    for (student_pk, last_name, first_name, category_pk, category_name,
+         weight, symbol_pk, symbol_name, value) in marks:
+        if student_pk not in students:
+            students[student_pk] = GradebookStudent(
+                student_pk, last_name, first_name)
+        if category_pk not in categories:
+            categories[category_pk] = GradebookCategory(
+                category_pk, category_name, weight)
+        if symbol_pk not in symbols:
+            symbols[symbol_pk] = GradebookSymbol(
+                symbol_pk, symbol_name, value)
+        entries.append((student_pk, category_pk, symbol_pk))
+
+    def indexes(items, key):
+        ordered = sorted(items.values(), key=key)
+        return ordered, {item.pk: index for index, item in enumerate(ordered)}
+
+    students, rows = indexes(
+        students, lambda s: (s.last_name, s.first_name, s.pk))
+    categories, columns = indexes(categories, lambda c: (c.name, c.pk))
+    symbols, symbol_indexes = indexes(
+        symbols, lambda s: (s.value, s.name, s.pk))
+
+    gradebook = Gradebook(students, categories, symbols)
+    for student_pk, category_pk, symbol_pk in entries:
+        gradebook.add_mark(rows[student_pk], columns[category_pk],
+                           symbol_indexes[symbol_pk])
+    gradebook.compute()
+    return gradebook
@@ -0,0 +1,140 @@
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Q
+import base64
+import binascii
+import json
+
+
+class InvalidCursor(Exception):
+    pass
+
+
+def encode_cursor(values):
+    """ Encode list of keyset values as url-safe string """
+    data = json.dumps(values, cls=DjangoJSONEncoder).encode()
+    return base64.urlsafe_b64encode(data).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """ Decode cursor created by encode_cursor(), raise InvalidCursor """
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        values = json.loads(data)
+    except (ValueError, binascii.Error):
+        raise InvalidCursor(cursor)
+    if not isinstance(values, list):
+        raise InvalidCursor(cursor)
+    return values
+
+
+class KeysetPage:
+    """
+    Page of objects, with interface similar to django.core.paginator.Page
+    in templates: object_list, has_next, has_previous, count (total
+    number of objects or None if not counted) and cursors to neighbour
+    pages (None if there is no such page).
+    """
+
+    def __init__(self, object_list, next_cursor, previous_cursor,
+                 count=None):
+        self.object_list = object_list
+        self.next_cursor = next_cursor
+        self.previous_cursor = previous_cursor
+        self.count = count
+
+    def has_next(self):
+        return self.next_cursor is not None
+
+    def has_previous(self):
+        return self.previous_cursor is not None
+
+    def has_other_pages(self):
+        return self.has_next() or self.has_previous()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+class KeysetPaginator:
+    """
+    Cursor based paginator. Queryset is ordered by 'keyset' fields
+    (last one has to be unique, e.g. 'pk'; '-' prefix for descending
+    order) and pages are selected with WHERE on these fields instead of
+    OFFSET, so every page takes the same time to load, regardless of its
+    position. Next/previous page existence is checked by fetching one
+    extra row. Total count is queried only if 'with_count' is set.
+    """
+
+    def __init__(self, queryset, per_page, keyset, with_count=True):
+        self.queryset = queryset
+        self.per_page = per_page
+        self.keyset = keyset
+        self.with_count = with_count
+
+    @staticmethod
+    def _split(field):
+        if field.startswith('-'):
+            return field[1:], True
+        return field, False
+
+    def _get_values(self, obj):
+        return [getattr(obj, self._split(field)[0]) for field in self.keyset]
+
+    def _get_filter(self, values, backwards=False):
+        """
+        Return Q selecting rows after (or before) row with provided
+        keyset values: (f1 > v1) OR (f1 = v1 AND f2 > v2) OR ...
+        """
+        if len(values) != len(self.keyset):
+            raise InvalidCursor(values)
+        q = Q()
+        equal = {}
+        for field, value in zip(self.keyset, values):
+            name, descending = self._split(field)
+            lookup = 'lt' if descending != backwards else 'gt'
+            q |= Q(**equal, **{'%s__%s' % (name, lookup): value})
+            equal[name] = value
+        return q
+
+    def get_page(self, after=None, before=None):
+        """
+        Return KeysetPage following 'after' cursor, preceding 'before'
+        cursor or first page if no cursor provided.
+        Raise InvalidCursor for malformed cursors.
+        """
+        qs = self.queryset
+        ordering = list(self.keyset)
+        backwards = before is not None and after is None
+        cursor = before if backwards else after
+        if cursor is not None:
+            values = decode_cursor(cursor)
+            try:
+                qs = qs.filter(self._get_filter(values, backwards))
+            except (ValidationError, ValueError, TypeError):
+                # values not matching fields' types
+                raise InvalidCursor(cursor)
+        if backwards:
+            ordering = [
+                name if descending else '-' + name
+                for name, descending in map(self._split, ordering)
+            ]
+        objects = list(qs.order_by(*ordering)[:self.per_page + 1])
+        has_more = len(objects) > self.per_page
+        objects = objects[:self.per_page]
+        if backwards:
+            objects.reverse()
+            has_next, has_previous = True, has_more
+        else:
+            has_next, has_previous = has_more, cursor is not None
+
+        next_cursor = previous_cursor = None
+        if objects and has_next:
+            next_cursor = encode_cursor(self._get_values(objects[-1]))
+        if objects and has_previous:
+            previous_cursor = encode_cursor(self._get_values(objects[0]))
+        count = self.queryset.count() if self.with_count else None
+        return KeysetPage(objects, next_cursor, previous_cursor, count)
@@ -1,74 +1,415 @@
+from itertools import islice
 import datetime
-from collections import OrderedDict
-from records.models import Lesson, Period
+from collections import OrderedDict, defaultdict
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Count, Q
+from django.utils.translation import gettext_lazy as _
+from records.models import Lesson, Period, Schedule
+from records.utils.cache import get_cache_version, bump_cache_version
+from records.utils.dates import get_dates_between, get_week_dates
 
+# timetables are cached for whole weeks: (group|teacher, pk, week's monday),
+# cache version is bumped to invalidate all of them at once
+TIMETABLE_CACHE_KEY = 'records:timetable:%s:%s:%s'
+TIMETABLES_VERSION_KEY = 'records:timetables_version'
+# teachers' numbers of unrealized lessons: (teacher pk, date)
+DASHBOARD_CACHE_KEY = 'records:dashboard:%s:%s'
 
-def get_teacher_timetable(dates, teacher):
+
+def get_periods():
+    """ Return list of all Periods ordered by starting time """
+    return list(Period.objects.all())
+
+
+def get_timetable_lessons():
+    """
+    Return queryset of Lessons with schedule, teacher, course and group
+    selected. Period is not joined - it's taken from already loaded
+    Periods list when the timetable is built.
     """
-    Return teacher's timetable in form of OrderedDict with Periods as keys
+    return Lesson.objects.select_related(
+        'schedule', 'schedule__teacher', 'schedule__course',
+        'schedule__course__group'
+    )
+
+
+def build_timetable(dates, lessons, periods=None):
+    """
+    Return timetable in form of OrderedDict with Periods as keys
     and lists of Lesson|None (if no Lesson on that day) as items,
     where first Lesson is related to first date provided in 'dates' parameter,
     second Lesson to second date, etc., meaning one key and corresponding
     item makes one row of timetable.
+    Lessons for the whole dates range are fetched with single query,
+    grid is filled in memory.
     """
-    timetable = OrderedDict()
-    periods = list(Period.objects.all())
+    if periods is None:
+        periods = get_periods()
+    return fill_timetable(dates, lessons.filter(date__in=dates), periods)
+
+
+def fill_timetable(dates, lessons, periods):
+    """
+    Return timetable (see build_timetable()) filled with already
+    loaded lessons, without querying database.
+    """
+    periods_by_pk = {period.pk: period for period in periods}
+    columns = {date: index for index, date in enumerate(dates)}
     days = len(dates)
 
+    timetable = OrderedDict()
     for period in periods:
         timetable[period] = [None] * days
 
-    for index, date in enumerate(dates):
-        lessons = Lesson.objects.filter(
-            date=date,
-            schedule__teacher=teacher
-        ).select_related('schedule', 'schedule__teacher', 'schedule__course',
-                         'schedule__course__group')
-        for lesson in list(lessons):
-            timetable[lesson.schedule.period][index] = lesson
+    for lesson in lessons:
+        period = periods_by_pk[lesson.schedule.period_id]
+        # reuse loaded Period, so template doesn't query it again
+        lesson.schedule.period = period
+        timetable[period][columns[lesson.date]] = lesson
     return timetable
 
 
+def get_teacher_timetable(dates, teacher):
+    """
+    Return teacher's timetable for provided dates.
+    See build_timetable() for returned structure.
+    """
+    lessons = get_timetable_lessons().filter(schedule__teacher=teacher)
+    return build_timetable(dates, lessons)
+
+
 def get_group_timetable(dates, group):
     """
-    Return groups's timetable in form of OrderedDict with Periods as keys
-    and lists of Lesson|None (if no Lesson on that day) as items,
-    where first Lesson is related to first date provided in 'dates' parameter,
-    second Lesson to second date, etc., meaning one key and corresponding
-    item makes one row of timetable.
+    Return groups's timetable for provided dates.
+    See build_timetable() for returned structure.
     """
-    timetable = OrderedDict()
-    periods = list(Period.objects.all())
-    days = len(dates)
+    lessons = get_timetable_lessons().filter(schedule__course__group=group)
+    return build_timetable(dates, lessons)
 
-    for period in periods:
-        timetable[period] = [None] * days
 
-    for index, date in enumerate(dates):
-        lessons = Lesson.objects.filter(
-            date=date,
-            schedule__course__group=group
-        ).select_related('schedule', 'schedule__teacher', 'schedule__course',
-                         'schedule__course__group')
-        for lesson in list(lessons):
-            timetable[lesson.schedule.period][index] = lesson
-    return timetable
+def _get_timetables_version():
+    return get_cache_version(TIMETABLES_VERSION_KEY)
+
+
+def _get_cached_timetable(kind, owner, dates, get_timetable):
+    """
+    Return timetable for dates from cached timetable of whole week.
+    If week's timetable isn't cached, build it with get_timetable().
+    """
+    week = get_week_dates(dates[0])
+    if not set(dates).issubset(week):
+        return get_timetable(dates, owner)
+
+    key = TIMETABLE_CACHE_KEY % (kind, owner.pk, week[0])
+    version = _get_timetables_version()
+    timetable = cache.get(key, version=version)
+    if timetable is None:
+        timetable = get_timetable(week, owner)
+        cache.set(key, timetable, settings.TIMETABLE_CACHE_TIMEOUT,
+                  version=version)
+    if dates == week:
+        return timetable
+
+    columns = [week.index(date) for date in dates]
+    return OrderedDict(
+        (period, [lessons[column] for column in columns])
+        for period, lessons in timetable.items()
+    )
+
+
+def get_cached_teacher_timetable(dates, teacher):
+    """ Cached version of get_teacher_timetable() """
+    return _get_cached_timetable(
+        'teacher', teacher, dates, get_teacher_timetable)
+
+
+def get_cached_group_timetable(dates, group):
+    """ Cached version of get_group_timetable() """
+    return _get_cached_timetable(
+        'group', group, dates, get_group_timetable)
+
+
+def invalidate_timetables(group_pk, teacher_pk, dates):
+    """
+    Remove cached timetables of group and teacher for weeks
+    containing provided dates, and teacher's cached number of
+    unrealized lessons if needed. Done after transaction is committed,
+    so old data can't be cached again meanwhile.
+    """
+    weeks = {get_week_dates(date)[0] for date in dates}
+    keys = []
+    for week in weeks:
+        keys.append(TIMETABLE_CACHE_KEY % ('group', group_pk, week))
+        keys.append(TIMETABLE_CACHE_KEY % ('teacher', teacher_pk, week))
+    # past lessons change teacher's number of unrealized lessons
+    today = datetime.date.today()
+    if any(date <= today for date in dates):
+        keys.append(DASHBOARD_CACHE_KEY % (teacher_pk, today))
+    transaction.on_commit(lambda: cache.delete_many(
+        keys, version=_get_timetables_version()))
+
+
+def invalidate_all_timetables():
+    """ Invalidate all cached timetables after transaction is committed """
+    transaction.on_commit(
+        lambda: bump_cache_version(TIMETABLES_VERSION_KEY))
 
 
 def get_lessons_table(teacher, date=None):
+    """
+    Return OrderedDict with Periods as keys and teacher's Lesson|None
+    on that date as items. Taken from cached teacher's timetable.
+    """
     if not date:
         date = datetime.date.today()
 
     table = OrderedDict()
+    timetable = get_cached_teacher_timetable([date, ], teacher)
+    for period, lessons in timetable.items():
+        table[period] = lessons[0]
+    return table
 
-    for period in Period.objects.all():
-        table[period] = None
 
-    lessons = Lesson.objects.filter(
-        date=date,
-        schedule__teacher=teacher
-    ).select_related('schedule', 'schedule__course', 'schedule__course__group',
-                     'schedule__period')
-    for lesson in lessons:
-        table[lesson.schedule.period] = lesson
-    return table
+def get_unrealized_lessons(teacher=None):
+    """
+    Return queryset of teacher's (all if None) past and today's lessons,
+    which weren't marked as realized or cancelled.
+    """
+    qs = Lesson.objects.filter(
+        status=Lesson.STATUS_PLANNED,
+        date__lte=datetime.date.today()
+    )
+    if teacher:
+        qs = qs.filter(schedule__teacher=teacher)
+    return qs
+
+
+def get_teacher_dashboard(teacher):
+    """
+    Return dict with teacher's today's lessons table (see
+    get_lessons_table()) and 'unrealized_count' - number of teacher's
+    unrealized lessons. Both are cached, so with warm cache no query
+    is made. Number of lessons is invalidated with teacher's timetables.
+    """
+    today = datetime.date.today()
+    key = DASHBOARD_CACHE_KEY % (teacher.pk, today)
+    version = _get_timetables_version()
+    unrealized_count = cache.get(key, version=version)
+    if unrealized_count is None:
+        unrealized_count = get_unrealized_lessons(teacher).count()
+        cache.set(key, unrealized_count, settings.TIMETABLE_CACHE_TIMEOUT,
+                  version=version)
+    return {
+        'table': get_lessons_table(teacher, today),
+        'unrealized_count': unrealized_count,
+    }
+
+
+def warm_teacher_dashboards(teachers):
+    """
+    Precompute and cache current week's timetables and numbers of
+    unrealized lessons of all provided teachers, with three queries.
+    """
+    week = get_week_dates()
+    periods = get_periods()
+    teachers = {teacher.pk: teacher for teacher in teachers}
+    lessons = defaultdict(list)
+    qs = get_timetable_lessons().filter(
+        date__in=week,
+        schedule__teacher__in=teachers.keys()
+    )
+    for lesson in qs:
+        lessons[lesson.schedule.teacher_id].append(lesson)
+    counts = get_unrealized_lessons()\
+        .filter(schedule__teacher__in=teachers.keys())\
+        .order_by()\
+        .values_list('schedule__teacher')\
+        .annotate(count=Count('pk'))
+    counts = dict(counts)
+
+    entries = {}
+    for pk in teachers.keys():
+        key = TIMETABLE_CACHE_KEY % ('teacher', pk, week[0])
+        entries[key] = fill_timetable(week, lessons[pk], periods)
+        key = DASHBOARD_CACHE_KEY % (pk, datetime.date.today())
+        entries[key] = counts.get(pk, 0)
+    cache.set_many(entries, settings.TIMETABLE_CACHE_TIMEOUT,
+                   version=_get_timetables_version())
+    return len(entries) // 2
+
+
+def get_schedules_errors(schedules):
+    """
+    Validate list of new or modified Schedule entries (with course,
+    teacher and period instances set). Return dict with entry's index as key
+    and ValidationError as item, empty dict if all entries are valid.
+    Entries are checked against each other and against entries existing
+    in database, fetched with one query. Collisions are detected in memory.
+    """
+    errors = {}
+    valid = []
+    # saved entries are validated with their new values
+    validated_pks = {schedule.pk for schedule in schedules if schedule.pk}
+    for index, schedule in enumerate(schedules):
+        try:
+            schedule._check_dates()
+        except ValidationError as error:
+            errors[index] = error
+            continue
+        schedule.day_of_week = schedule.date_start.weekday()
+        valid.append((index, schedule))
+    if not valid:
+        return errors
+
+    # group all entries (existing and new) by weekday and period
+    existing = Schedule.objects.filter(
+        Q(teacher__in={s.teacher_id for _, s in valid})
+        | Q(course__group__in={s.course.group_id for _, s in valid}),
+        day_of_week__in={s.day_of_week for _, s in valid},
+        period__in={s.period_id for _, s in valid},
+        date_start__lte=max(s.date_end for _, s in valid),
+        date_end__gte=min(s.date_start for _, s in valid),
+    ).select_related('teacher', 'course', 'course__group', 'period')
+    slots = defaultdict(list)
+    for entry in existing:
+        if entry.pk in validated_pks:
+            continue
+        slots[(entry.day_of_week, entry.period_id)].append(entry)
+
+    for index, schedule in valid:
+        slot = slots[(schedule.day_of_week, schedule.period_id)]
+        collisions_group = []
+        collisions_teacher = []
+        for entry in slot:
+            same_group, same_teacher = schedule.collides_with(entry)
+            if same_group:
+                collisions_group.append(entry)
+            if same_teacher:
+                collisions_teacher.append(entry)
+        error = Schedule.get_collisions_error(
+            collisions_group, collisions_teacher)
+        if error:
+            errors[index] = error
+        else:
+            # next entries are checked against this one as well
+            slot.append(schedule)
+    return errors
+
+
+def bulk_create_schedules(schedules, batch_size=None):
+    """
+    Validate and create Schedule entries with all their Lessons using
+    bulk inserts in one transaction. post_save signal isn't sent,
+    Lessons are created here. Raise ValidationError with messages
+    prefixed by entry's number (counted from 1) if any entry is invalid.
+    Return number of created Lessons.
+    """
+    errors = get_schedules_errors(schedules)
+    if errors:
+        messages = []
+        for index, error in sorted(errors.items()):
+            for field, field_messages in error.message_dict.items():
+                for message in field_messages:
+                    messages.append("%i: %s: %s" % (index + 1, field, message))
+        raise ValidationError(messages)
+
+    with transaction.atomic():
+        Schedule.objects.bulk_create(schedules, batch_size=batch_size)
+        if schedules and schedules[0].pk is None:
+            _load_schedules_pks(schedules)
+        lessons = []
+        for schedule in schedules:
+            dates = get_dates_between(schedule.date_start, schedule.date_end)
+            lessons.extend(
+                Lesson(schedule=schedule, date=date) for date in dates)
+        Lesson.objects.bulk_create(lessons, batch_size=batch_size)
+    for schedule in schedules:
+        invalidate_timetables(
+            schedule.course.group_id, schedule.teacher_id,
+            get_dates_between(schedule.date_start, schedule.date_end))
+    return len(lessons)
+
+
+def _load_schedules_pks(schedules):
+    """
+    Set primary keys of bulk created entries, for database backends
+    not returning them from bulk insert. Teacher, weekday, period and
+    start date identify an entry, as teacher's entries can't collide.
+    """
+    qs = Schedule.objects.filter(
+        teacher__in={s.teacher_id for s in schedules},
+        period__in={s.period_id for s in schedules},
+        date_start__in={s.date_start for s in schedules},
+    ).values_list('pk', 'teacher', 'day_of_week', 'period', 'date_start')
+    pks = {tuple(row[1:]): row[0] for row in qs}
+    for schedule in schedules:
+        schedule.pk = pks[(schedule.teacher_id, schedule.day_of_week,
+                           schedule.period_id, schedule.date_start)]
+
+
+def sync_lessons_bulk(schedules, batch_size=1000):
+    """
+    Bulk version of sync_lessons signal handler for many saved Schedule
+    entries. Create missing Lessons and delete Lessons outside entries'
+    dates ranges. If any of deleted Lessons has status = Realized raise
+    ValidationError. Existing Lessons are read with one query, new ones
+    are streamed to database in batches of batch_size.
+    Return tuple (number of created Lessons, number of deleted Lessons).
+    """
+    schedules = {schedule.pk: schedule for schedule in schedules}
+    missing_dates = {
+        pk: set(get_dates_between(schedule.date_start, schedule.date_end))
+        for pk, schedule in schedules.items()
+    }
+
+    to_delete = []
+    deleted_dates = defaultdict(list)
+    realized = defaultdict(list)
+    existing = Lesson.objects\
+        .filter(schedule__in=schedules.keys())\
+        .order_by()\
+        .values_list('pk', 'schedule', 'date', 'status')
+    for pk, schedule_pk, date, status in existing.iterator():
+        if date in missing_dates[schedule_pk]:
+            missing_dates[schedule_pk].remove(date)
+            continue
+        to_delete.append(pk)
+        deleted_dates[schedule_pk].append(date)
+        if status == Lesson.STATUS_REALIZED:
+            realized[schedule_pk].append(date)
+
+    if realized:
+        raise ValidationError([
+            _("%(schedule)s: Invalid dates - realized lessons out of range: "
+              "%(realized)s") % {
+                'schedule': schedules[pk],
+                'realized': ", ".join(map(str, sorted(dates)))
+            } for pk, dates in realized.items()
+        ])
+
+    lessons = (
+        Lesson(schedule=schedules[pk], date=date)
+        for pk, dates in missing_dates.items()
+        for date in sorted(dates)
+    )
+    created = 0
+    with transaction.atomic():
+        for i in range(0, len(to_delete), batch_size):
+            Lesson.objects\
+                .filter(pk__in=to_delete[i:i + batch_size])\
+                .delete()
+        while True:
+            batch = list(islice(lessons, batch_size))
+            if not batch:
+                break
+            Lesson.objects.bulk_create(batch)
+            created += len(batch)
+
+    for pk, schedule in schedules.items():
+        invalidate_timetables(
+            schedule.course.group_id, schedule.teacher_id,
+            list(missing_dates[pk]) + deleted_dates[pk])
+    return created, len(to_delete)
@@ -0,0 +1,197 @@
+from concurrent.futures import ProcessPoolExecutor
+from django.contrib.auth.hashers import make_password
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.utils.translation import gettext_lazy as _
+from records.models import User
+from records.signals.auth import get_random_username
+from itertools import chain
+import csv
+import django
+import multiprocessing
+
+# CSV columns (User fields) read by parse_students_csv()
+IMPORT_FIELDS = ['last_name', 'first_name', 'birth_date', 'email',
+                 'address', 'zip_code', 'city', 'phone']
+REQUIRED_COLUMNS = ['last_name', 'first_name']
+
+CREDENTIALS_HEADER = ['last_name', 'first_name', 'birth_date', 'username',
+                      'password']
+
+# starting worker process (with django.setup()) takes longer than hashing
+# few passwords, so every worker gets at least that many of them
+PASSWORDS_PER_WORKER = 20
+
+
+class StudentImportError(Exception):
+    pass
+
+
+def parse_students_csv(file):
+    """
+    Read students from CSV text file with header row of User field names
+    (see IMPORT_FIELDS, other columns are ignored).
+    Every row is validated as unsaved User instance.
+    Return tuple (list of (line number, User) pairs, dict with line number
+    as key and ValidationError as item).
+    Raise StudentImportError if required columns are missing.
+    """
+    reader = csv.DictReader(file)
+    columns = reader.fieldnames or []
+    missing = [column for column in REQUIRED_COLUMNS
+               if column not in columns]
+    if missing:
+        raise StudentImportError(
+            _('Missing CSV columns: %s') % ', '.join(missing))
+
+    students = []
+    errors = {}
+    for row in reader:
+        values = {}
+        for name in IMPORT_FIELDS:
+            value = (row.get(name) or '').strip()
+            if not value and User._meta.get_field(name).null:
+                value = None
+            values[name] = value
+        student = User(is_teacher=False, **values)
+        try:
+            student.full_clean(exclude=['username', 'password'],
+                               validate_unique=False)
+        except ValidationError as error:
+            errors[reader.line_num] = error
+            continue
+        students.append((reader.line_num, student))
+    return students, errors
+
+
+def get_student_key(last_name, first_name, birth_date):
+    """ Return key identifying person, used to find duplicates """
+    return (last_name.strip().casefold(), first_name.strip().casefold(),
+            birth_date)
+
+
+def split_duplicates(students):
+    """
+    Separate students already existing in database (or repeated in list)
+    from new ones. Users are matched by last name, first name
+    (case-insensitive) and birth date. Keys of all existing users are
+    loaded with one query into in-memory index.
+    Return tuple (new students, duplicates), both lists of items
+    as provided.
+    """
+    existing = set(
+        get_student_key(*values)
+        for values in User.objects
+        .values_list('last_name', 'first_name', 'birth_date')
+        .order_by()
+        .iterator()
+    )
+    new = []
+    duplicates = []
+    for item in students:
+        student = item[1]
+        key = get_student_key(student.last_name, student.first_name,
+                              student.birth_date)
+        if key in existing:
+            duplicates.append(item)
+        else:
+            existing.add(key)
+            new.append(item)
+    return new, duplicates
+
+
+def assign_usernames(users, batch_size=500):
+    """
+    Set random usernames (same format as generated by pre_save signal)
+    of users without one. Collisions with existing users are checked
+    with one query per 'batch_size' users, colliding names are generated
+    again.
+    """
+    used = set()
+    pending = [user for user in users if not user.username]
+    while pending:
+        unique = []
+        retry = []
+        for user in pending:
+            user.username = get_random_username(user.first_name)
+            if user.username in used:
+                retry.append(user)
+            else:
+                used.add(user.username)
+                unique.append(user)
+        for start in range(0, len(unique), batch_size):
+            batch = {user.username: user
+                     for user in unique[start:start + batch_size]}
+            taken = User.objects\
+                .filter(username__in=batch.keys())\
+                .values_list('username', flat=True)
+            retry.extend(batch[username] for username in taken)
+        pending = retry
+
+
+def hash_passwords(passwords):
+    return [make_password(password) for password in passwords]
+
+
+def make_passwords(count, workers=1):
+    """
+    Return list of 'count' (random password, hash) pairs.
+    Hashing is slow by design (PBKDF2 by default) and CPU bound, so it
+    can be split between 'workers' processes, hashing at least
+    PASSWORDS_PER_WORKER passwords each. Processes are spawned, not
+    forked, so they don't inherit web server's state and database
+    connections.
+    """
+    passwords = [User.objects.make_random_password() for _ in range(count)]
+    workers = min(workers or 1, -(-count // PASSWORDS_PER_WORKER))
+    if workers <= 1:
+        return list(zip(passwords, hash_passwords(passwords)))
+
+    size = -(-count // workers)
+    chunks = [passwords[i:i + size] for i in range(0, count, size)]
+    with ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context('spawn'),
+            initializer=django.setup) as executor:
+        hashes = chain.from_iterable(executor.map(hash_passwords, chunks))
+        return list(zip(passwords, hashes))
+
+
+def import_students(students, workers=1, batch_size=500):
+    """
+    Create new students (unsaved User instances) with random usernames
+    and passwords, using bulk_create (save() isn't called and pre_save
+    signal isn't sent). See make_passwords() about 'workers'.
+    Return list of (student, raw password) pairs - raw passwords aren't
+    stored anywhere, so they have to be handed out now.
+    """
+    students = list(students)
+    if not students:
+        return []
+    assign_usernames(students, batch_size)
+    credentials = make_passwords(len(students), workers)
+    for student, (password, hashed) in zip(students, credentials):
+        student.password = hashed
+        student.set_search_names()
+
+    with transaction.atomic():
+        User.objects.bulk_create(students, batch_size=batch_size)
+        if students[0].pk is None:
+            # pks aren't returned by bulk_create on every backend
+            by_username = {student.username: student for student in students}
+            for start in range(0, len(students), batch_size):
+                usernames = [student.username
+                             for student in students[start:start + batch_size]]
+                pks = User.objects\
+                    .filter(username__in=usernames)\
+                    .values_list('username', 'pk')
+                for username, pk in pks:
+                    by_username[username].pk = pk
+    return [(student, password)
+            for student, (password, hashed) in zip(students, credentials)]
+
+
+def get_credentials_rows(credentials):
+    """ Yield rows (see CREDENTIALS_HEADER) of imported students """
+    for student, password in credentials:
+        yield [student.last_name, student.first_name, student.birth_date,
+               student.username, password]
@@ -1,15 +1,144 @@
+from collections import defaultdict
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import Exists, OuterRef, Q
 from records.models import User, StudentGroup, StudentGroupAssignment
 from datetime import date
 
 
 def get_students_without_group():
     today = date.today()
-    qs_students_in_groups = User.objects.filter(
-        assignments__date_start__lte=today,
-        assignments__date_end__gte=today
+    # correlated subquery, resolved with student's assignments index
+    current_assignments = StudentGroupAssignment.objects.filter(
+        student=OuterRef('pk'),
+        date_start__lte=today,
+        date_end__gte=today
     )
-    # not working in sqlite (.difference() with .order_by())
-    # return User.objects.all().difference(qs_students_in_groups)
     return User.objects\
         .filter(is_teacher=False)\
-        .exclude(pk__in=qs_students_in_groups)
+        .filter(~Exists(current_assignments))
+
+
+def _prefix_filter(field, prefix):
+    """
+    Return Q matching case-insensitive prefix of field's normalised copy
+    '<field>_search'. Range lookup is used instead of LIKE, so it is
+    resolved with index on normalised names on every backend.
+    """
+    prefix = User.normalize_name(prefix)
+    return Q(**{
+        '%s_search__gte' % field: prefix,
+        '%s_search__lt' % field: prefix + chr(0x10FFFF),
+    })
+
+
+def search_users(qs, term):
+    """
+    Filter users queryset by name prefixes and order it by name.
+    One word matches beginning of last or first name, with more words
+    first two have to match beginnings of last and first name (in any
+    order), e.g. 'kow j' and 'jan kowal' both match Jan Kowalski.
+    """
+    qs = qs.order_by('last_name_search', 'first_name_search', 'pk')
+    words = term.split()
+    if not words:
+        return qs
+    if len(words) == 1:
+        return qs.filter(
+            _prefix_filter('last_name', words[0])
+            | _prefix_filter('first_name', words[0])
+        )
+    first, second = words[:2]
+    return qs.filter(
+        (_prefix_filter('last_name', first)
+         & _prefix_filter('first_name', second))
+        | (_prefix_filter('last_name', second)
+           & _prefix_filter('first_name', first))
+    )
+
+
+def prefetch_current_assignments(users):
+    """
+    Resolve current assignments (with groups) of all provided users with
+    one query and store them on instances, so User.student_group doesn't
+    query database for each of them. Fetched assignments are also cached.
+    Meant for list views - if 'users' is a queryset, it's evaluated and
+    its cached instances are used later.
+    """
+    today = date.today()
+    users = [user for user in users if user.pk]
+    assignments = {user.pk: None for user in users}
+    qs = StudentGroupAssignment.objects.filter(
+        student__in=assignments.keys(),
+        date_start__lte=today,
+        date_end__gte=today,
+    ).select_related('group').order_by()
+    for assignment in qs:
+        assignments[assignment.student_id] = assignment
+    for user in users:
+        user._current_assignment = (today, assignments[user.pk])
+    User.cache_current_assignments(assignments, today)
+    return assignments
+
+
+def get_assignments_errors(assignments):
+    """
+    Validate list of new or modified StudentGroupAssignments (with student
+    instances set). Return dict with entry's index as key and
+    ValidationError as item, empty dict if all entries are valid.
+    Overlapping assignments of all students are fetched with one range
+    query, entries are also checked against each other in memory.
+    """
+    errors = {}
+    valid = []
+    # saved entries are validated with their new values
+    validated_pks = {a.pk for a in assignments if a.pk}
+    for index, assignment in enumerate(assignments):
+        try:
+            assignment._check_dates()
+        except ValidationError as error:
+            errors[index] = error
+            continue
+        valid.append((index, assignment))
+    if not valid:
+        return errors
+
+    existing = StudentGroupAssignment.objects.filter(
+        student__in={a.student_id for _, a in valid},
+        date_start__lte=max(a.date_end for _, a in valid),
+        date_end__gte=min(a.date_start for _, a in valid),
+    ).select_related('group').order_by('date_start')
+    by_student = defaultdict(list)
+    for entry in existing:
+        if entry.pk not in validated_pks:
+            by_student[entry.student_id].append(entry)
+
+    for index, assignment in valid:
+        entries = by_student[assignment.student_id]
+        collisions = [e for e in entries if assignment.collides_with(e)]
+        if collisions:
+            errors[index] = assignment.get_collisions_error(collisions)
+        else:
+            # next entries are checked against this one as well
+            entries.append(assignment)
+    return errors
+
+
+def bulk_create_assignments(assignments, skip_invalid=False):
+    """
+    Validate new StudentGroupAssignments together and insert them with
+    bulk_create. If any entry is invalid, nothing is created, unless
+    'skip_invalid' is set - then only valid entries are created.
+    Return tuple (list of created assignments, dict of errors by index).
+    Signals aren't sent, cached current assignments are invalidated here.
+    """
+    assignments = list(assignments)
+    errors = get_assignments_errors(assignments)
+    if errors and not skip_invalid:
+        return [], errors
+
+    valid = [a for index, a in enumerate(assignments) if index not in errors]
+    with transaction.atomic():
+        StudentGroupAssignment.objects.bulk_create(valid)
+    User.invalidate_current_assignments({a.student_id for a in valid})
+    return valid, errors
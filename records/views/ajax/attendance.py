@@ -0,0 +1,148 @@
+from django.core.exceptions import PermissionDenied
+from django.db import transaction
+from django.http import JsonResponse
+from django.http.response import Http404
+from django.views.generic import View
+from django.utils.translation import gettext_lazy as _
+from django.contrib.auth.mixins import PermissionRequiredMixin
+from records.models import Attendance, Lesson
+from records.utils.attendance import (
+    get_lesson_attendances, set_attendance_status, update_attendances
+)
+import datetime
+import json
+
+
+class AttendanceLessonMixin:
+    """
+    Get Lesson provided in url kwargs, which attendance can be checked
+    by request's user - lesson's teacher, only past/today lessons.
+    """
+    lesson = None
+
+    def dispatch(self, request, *args, **kwargs):
+        if self.get_lesson().schedule.teacher_id != request.user.pk:
+            raise PermissionDenied
+        return super().dispatch(request, *args, **kwargs)
+
+    def get_lesson(self):
+        if self.lesson:
+            return self.lesson
+
+        try:
+            self.lesson = Lesson.objects\
+                .select_related('schedule')\
+                .get(pk=self.kwargs.get('lesson'),
+                     date__lte=datetime.date.today())
+        except (Lesson.DoesNotExist, ValueError):
+            raise Http404(_('Invalid Lesson primary key.'))
+        return self.lesson
+
+
+class AttendanceBulkUpdateView(PermissionRequiredMixin,
+                               AttendanceLessonMixin, View):
+    """
+    Set attendance statuses of many Lesson's students at once.
+    Needs Lesson provided in url kwargs. Expects JSON body:
+        {"attendances": {"<student pk>": status, ...}}
+    Unchanged attendances are skipped, changed ones are written with one
+    query. Response contains only changed entries:
+        {"changed": {"<student pk>": status, ...}}
+    Nothing is saved if any entry is invalid.
+    """
+    permission_required = ['records.change_attendance']
+    # raise exception so login form isn't returned as ajax response
+    raise_exception = True
+    statuses = {status for status, _ in Attendance.STATUS_CHOICES}
+
+    def get_entries(self):
+        try:
+            entries = json.loads(self.request.body)['attendances']
+            return {
+                int(student): int(status)
+                for student, status in entries.items()
+            }
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return None
+
+    def get_errors(self, entries, attendances):
+        """ Return list of dicts with student's pk, field and message """
+        errors = []
+        for student, status in entries.items():
+            if student not in attendances:
+                errors.append({
+                    'student': student,
+                    'field': 'student',
+                    'message': _('Student not attending the lesson.'),
+                })
+            elif status not in self.statuses:
+                errors.append({
+                    'student': student,
+                    'field': 'status',
+                    'message': _('Select a valid choice.'),
+                })
+        return errors
+
+    def post(self, request, *args, **kwargs):
+        if self.get_lesson().is_cancelled:
+            error_msg = _('Error - lesson is cancelled.')
+            return JsonResponse({'error_msg': error_msg}, status=400)
+
+        entries = self.get_entries()
+        if not entries:
+            error_msg = _('Error - invalid data.')
+            return JsonResponse({'error_msg': error_msg}, status=400)
+
+        with transaction.atomic():
+            attendances = get_lesson_attendances(self.lesson)
+            errors = self.get_errors(entries, attendances)
+            if errors:
+                return JsonResponse({'errors': errors}, status=400)
+            changed = update_attendances(attendances, entries)
+        return JsonResponse({
+            'changed': {
+                attendance.student_id: attendance.status
+                for attendance in changed
+            }
+        }, status=200)
+
+
+class AttendanceSetView(PermissionRequiredMixin, View):
+    """
+    Set attendance status of one student (Lesson and student pks provided
+    in url kwargs) - request sent for every click on the lesson page.
+    Expects POST params 'status' and optional 'seq' (number increasing
+    with every click, starting from the saved one rendered with the row).
+    Requests with 'seq' not greater than already saved one are dropped,
+    so only the last click is written (see set_attendance_status).
+    Responses contain saved status and seq:
+        {"status": status, "changed": bool, "seq": seq} or
+        {"stale": true, "status": status, "seq": seq}
+    """
+    permission_required = ['records.change_attendance']
+    # raise exception so login form isn't returned as ajax response
+    raise_exception = True
+    statuses = AttendanceBulkUpdateView.statuses
+
+    def post(self, request, *args, **kwargs):
+        lesson, student = self.kwargs['lesson'], self.kwargs['student']
+        try:
+            status = int(request.POST['status'])
+            seq = request.POST.get('seq')
+            seq = int(seq) if seq else None
+        except (KeyError, ValueError):
+            status = None
+        if status not in self.statuses:
+            error_msg = _('Error - invalid data.')
+            return JsonResponse({'error_msg': error_msg}, status=400)
+
+        try:
+            changed, status, seq = set_attendance_status(
+                request.user, lesson, student, status, seq)
+        except Attendance.DoesNotExist:
+            raise Http404(_('Invalid Lesson or student primary key.'))
+        if changed is None:
+            return JsonResponse({'stale': True, 'status': status, 'seq': seq},
+                                status=200)
+        return JsonResponse({'status': status, 'changed': changed,
+                             'seq': seq}, status=200)
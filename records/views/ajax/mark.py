@@ -1,11 +1,16 @@
 from django.core.exceptions import ImproperlyConfigured
+from django.db import transaction
 from django.http.response import Http404
-from django.views.generic import DetailView, UpdateView, CreateView
+from django.views.generic import DetailView, UpdateView, CreateView, View
 from django.http import JsonResponse
 from django.utils.translation import gettext_lazy as _
 from django.contrib.auth.mixins import PermissionRequiredMixin
-from records.models import Mark, Course, Lesson, User
+from records.models import (
+    Mark, Course, Lesson, User, Category, Symbol, ConcurrentModificationError
+)
 from records.forms.mark import MarkCreateForm, MarkUpdateForm
+from records.utils.mark import bulk_create_marks
+import json
 
 
 class MarkDetailView(PermissionRequiredMixin, DetailView):
@@ -70,7 +75,14 @@ class MarkUpdateView(PermissionRequiredMixin, UpdateView):
     def form_valid(self, form):
         instance = form.save(commit=False)
         instance.modifying_user = self.request.user
-        instance.save()
+        instance.expected_date_modified = form.cleaned_data['date_modified']
+        try:
+            # savepoint, so failed update doesn't break outer transaction
+            with transaction.atomic():
+                instance.save()
+        except ConcurrentModificationError as e:
+            form.add_error(None, str(e))
+            return self.form_invalid(form)
         return JsonResponse(
             {
                 'pk': instance.pk,
@@ -84,22 +96,14 @@ class MarkUpdateView(PermissionRequiredMixin, UpdateView):
         return JsonResponse({"errors": errors}, status=400)
 
 
-class MarkCreateView(PermissionRequiredMixin, CreateView):
+class MarkTargetMixin:
     """
-    View to view and process Mark creation form.
-    Needs Lesson [or Course - TODO] provided in url kwargs.
-    Queryset for 'student' field is generated based on provided model:
+    Get Lesson or Course provided in url kwargs and students who
+    can be given marks:
         - student's with Attendance related to Lesson if provided
-        - all student's with Assignments to the Course's group if
+        - students currently assigned to the Course's group if
         Course instance provided
     """
-    permission_required = ['records.add_mark']
-    # raise exception so login form isn't returned as ajax response
-    raise_exception = True
-    model = Mark
-    form_class = MarkCreateForm
-    prefix = 'create'
-    template_name = 'records/ajax/mark_create.html'
     course = None
     lesson = None
 
@@ -132,8 +136,11 @@ class MarkCreateView(PermissionRequiredMixin, CreateView):
         if self.course:
             return self.course
 
+        course_qs = Course.objects\
+            .filter(pk=self.kwargs.get('course'))\
+            .select_related('group')
         try:
-            self.course = Course.objects.get(pk=self.kwargs.get('course'))
+            self.course = course_qs.get()
         except Course.DoesNotExist:
             raise Http404(_('Invalid Course primary key.'))
         return self.course
@@ -145,10 +152,25 @@ class MarkCreateView(PermissionRequiredMixin, CreateView):
             )
             students = User.objects.filter(pk__in=students_pks)
         else:
-            # TODO: get students from Course
-            pass
+            students = self.course.group.get_students_by_date()
         return students
 
+
+class MarkCreateView(PermissionRequiredMixin, MarkTargetMixin, CreateView):
+    """
+    View to view and process Mark creation form.
+    Needs Lesson or Course provided in url kwargs.
+    Queryset for 'student' field is generated based on provided model
+    (see MarkTargetMixin).
+    """
+    permission_required = ['records.add_mark']
+    # raise exception so login form isn't returned as ajax response
+    raise_exception = True
+    model = Mark
+    form_class = MarkCreateForm
+    prefix = 'create'
+    template_name = 'records/ajax/mark_create.html'
+
     def get_initial(self):
         initial = {
             'teacher': self.request.user,
@@ -176,3 +198,82 @@ class MarkCreateView(PermissionRequiredMixin, CreateView):
     def form_invalid(self, form):
         errors = form.errors.as_json()
         return JsonResponse({"errors": errors}, status=400)
+
+
+class MarkBulkCreateView(PermissionRequiredMixin, MarkTargetMixin, View):
+    """
+    Create marks for many students at once. Needs Lesson or Course
+    provided in url kwargs. Expects JSON body:
+        {"marks": [{"student": pk, "category": pk, "symbol": pk}, ...]}
+    Students are validated against Lesson's attendances (or Course's
+    group) with one query. Nothing is created if any entry is invalid.
+    """
+    permission_required = ['records.add_mark']
+    # raise exception so login form isn't returned as ajax response
+    raise_exception = True
+    fields = ['student', 'category', 'symbol']
+
+    def get_entries(self):
+        try:
+            entries = json.loads(self.request.body)['marks']
+            return [
+                {field: int(entry[field]) for field in self.fields}
+                for entry in entries
+            ]
+        except (ValueError, KeyError, TypeError):
+            return None
+
+    def get_errors(self, entries):
+        """ Return list of dicts with entry index, field and message """
+        valid_pks = {
+            'student': set(
+                self.get_students().values_list('pk', flat=True)),
+            'category': set(
+                Category.objects.filter(
+                    pk__in={entry['category'] for entry in entries}
+                ).values_list('pk', flat=True)),
+            'symbol': set(
+                Symbol.objects.filter(
+                    pk__in={entry['symbol'] for entry in entries}
+                ).values_list('pk', flat=True)),
+        }
+        errors = []
+        for index, entry in enumerate(entries):
+            for field in self.fields:
+                if entry[field] not in valid_pks[field]:
+                    errors.append({
+                        'index': index,
+                        'field': field,
+                        'message': _('Select a valid choice.'),
+                    })
+        return errors
+
+    def post(self, request, *args, **kwargs):
+        entries = self.get_entries()
+        if not entries:
+            error_msg = _('Error - invalid data.')
+            return JsonResponse({'error_msg': error_msg}, status=400)
+
+        errors = self.get_errors(entries)
+        if errors:
+            return JsonResponse({'errors': errors}, status=400)
+
+        marks = [
+            Mark(
+                student_id=entry['student'],
+                teacher=self.request.user,
+                course=self.get_course(),
+                category_id=entry['category'],
+                symbol_id=entry['symbol'],
+            ) for entry in entries
+        ]
+        bulk_create_marks(marks, self.request.user)
+        return JsonResponse({
+            'marks': [
+                {
+                    'pk': mark.pk,
+                    'symbol': mark.symbol_id,
+                    'student': mark.student_id,
+                } for mark in marks
+            ]
+        }, status=200)
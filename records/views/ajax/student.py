@@ -0,0 +1,49 @@
+from django.views.generic import View
+from django.http import JsonResponse
+from django.contrib.auth.mixins import PermissionRequiredMixin
+from records.models import User
+from records.utils.user import get_students_without_group, search_users
+
+
+class StudentSearchView(PermissionRequiredMixin, View):
+    """
+    Search students by name, used by select2 widgets loading options
+    on demand. GET params:
+        - term - name prefixes (see utils.user.search_users)
+        - page - page number counted from 1
+        - without_group - if set, only students without current group
+    Response format: {"results": [{"id", "text"}], "pagination": {"more"}}.
+    Next page is detected by fetching one extra row, without counting.
+    """
+    permission_required = ['records.view_student']
+    # raise exception so login form isn't returned as ajax response
+    raise_exception = True
+    paginate_by = 20
+
+    def get_queryset(self):
+        if self.request.GET.get('without_group'):
+            qs = get_students_without_group()
+        else:
+            qs = User.objects.filter(is_teacher=False)
+        return search_users(qs, self.request.GET.get('term', ''))
+
+    def get_page(self):
+        try:
+            return max(int(self.request.GET.get('page', 1)), 1)
+        except ValueError:
+            return 1
+
+    def get(self, request, *args, **kwargs):
+        offset = (self.get_page() - 1) * self.paginate_by
+        students = list(
+            self.get_queryset()
+            .only('pk', 'first_name', 'last_name')
+            [offset:offset + self.paginate_by + 1]
+        )
+        return JsonResponse({
+            'results': [
+                {'id': student.pk, 'text': str(student)}
+                for student in students[:self.paginate_by]
+            ],
+            'pagination': {'more': len(students) > self.paginate_by},
+        })
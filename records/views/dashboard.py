@@ -1,7 +1,7 @@
 from django.views.generic import TemplateView, RedirectView
 from django.contrib.auth.mixins import LoginRequiredMixin, UserPassesTestMixin
 from django.urls import reverse_lazy
-from records.utils.schedule import get_lessons_table
+from records.utils.schedule import get_teacher_dashboard
 
 
 class DashboardRedirectView(LoginRequiredMixin, RedirectView):
@@ -25,6 +25,7 @@ class TeacherDashboardView(LoginRequiredMixin, UserPassesTestMixin,
         return self.request.user.is_teacher
 
     def get_context_data(self, **kwargs):
+        """ Add today's lessons and unrealized lessons count (cached) """
         context = super().get_context_data(**kwargs)
-        context['table'] = get_lessons_table(self.request.user)
+        context.update(get_teacher_dashboard(self.request.user))
         return context
@@ -0,0 +1,52 @@
+from django.views.generic import View
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from django.contrib.auth.mixins import PermissionRequiredMixin
+from django.utils.translation import gettext_lazy as _
+from records.forms.export import ExportFilterForm
+from records.utils.export import (
+    EXPORTS, EXPORT_FORMATS, get_export_queryset
+)
+
+
+class ExportView(PermissionRequiredMixin, View):
+    """
+    Stream marks, attendance or lessons (export name provided in url
+    kwargs) as CSV or JSON lines file. Rows are fetched in chunks as
+    tuples, so memory usage doesn't depend on number of rows.
+    GET params are validated with ExportFilterForm.
+    """
+    chunk_size = 2000
+
+    def get_export_name(self):
+        name = self.kwargs.get('name')
+        if name not in EXPORTS:
+            raise Http404(_('Invalid export name.'))
+        return name
+
+    def get_permission_required(self):
+        return [EXPORTS[self.get_export_name()]['permission']]
+
+    def get(self, request, *args, **kwargs):
+        name = self.get_export_name()
+        form = ExportFilterForm(self.request.GET)
+        if not form.is_valid():
+            return JsonResponse(
+                {'errors': form.errors.get_json_data()}, status=400)
+
+        filters = form.cleaned_data
+        queryset = get_export_queryset(
+            name,
+            group=filters['group'],
+            course=filters['course'],
+            date_from=filters['date_from'],
+            date_to=filters['date_to'],
+        )
+        file_format = filters['format'] or 'csv'
+        iter_rows, content_type = EXPORT_FORMATS[file_format]
+        response = StreamingHttpResponse(
+            iter_rows(name, queryset, chunk_size=self.chunk_size),
+            content_type=content_type
+        )
+        response['Content-Disposition'] = \
+            'attachment; filename="%s.%s"' % (name, file_format)
+        return response
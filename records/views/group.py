@@ -1,4 +1,4 @@
-from django.http.response import HttpResponseRedirect
+from django.http.response import HttpResponse, HttpResponseRedirect
 from django.shortcuts import get_object_or_404
 from records.models.studentgroup import StudentGroupAssignment
 from django.views.generic import CreateView, DetailView, ListView, UpdateView
@@ -9,20 +9,24 @@ from django.urls import reverse_lazy
 from django.utils.translation import gettext_lazy as _
 from django.contrib import messages
 from django.views.generic.edit import FormView
-from django.db import transaction
 from django.db.models import When, Case, Value
-from django.core.exceptions import ValidationError
 from django.contrib.auth import get_user_model
 from records.models import StudentGroup, Course
 from records.forms import group as group_forms
+from records.forms.attendance import DateRangeForm
 from records.views.schedule import GroupTimetableView
-from records.views.mixins import PrevURLMixin
+from records.views.mixins import PrevURLMixin, KeysetPaginationMixin
+from records.utils.user import bulk_create_assignments
+from records.utils.attendance import get_course_register
+from records.utils.export import iter_gradebook_csv
+from records.utils.mark import get_course_gradebook
 import datetime
 
 User = get_user_model()
 
 
-class GroupListView(PermissionRequiredMixin, ListView):
+class GroupListView(PermissionRequiredMixin, KeysetPaginationMixin,
+                    ListView):
     """
     View to show list of StudentGroups.
     Need 'records.view_studentgroup' permission to access.
@@ -31,6 +35,7 @@ class GroupListView(PermissionRequiredMixin, ListView):
     model = StudentGroup
     template_name = 'records/group/group_list.html'
     paginate_by = 20
+    keyset = ('name', 'pk')
     context_object_name = 'groups'
 
     def get_queryset(self):
@@ -161,30 +166,22 @@ class AssignManyToGroupView(PermissionRequiredMixin,
             'group': self.object
         }
 
-        errors = []
-        count = 0
-        try:
-            with transaction.atomic():
-                # Assign students to group
-                for student in students_to_add:
-                    try:
-                        assignment = StudentGroupAssignment(
-                            student=student, **kwargs
-                        )
-                        assignment.full_clean()
-                        assignment.save()
-                        count += 1
-                    except ValidationError as error:
-                        errors.append(error)
-                if errors and 'unsafe_add' not in self.request.POST:
-                    # Raise error to rollback whole transaction,
-                    # if user didn't select option to skip collissions
-                    form.add_error(None, errors)
-                    raise ValidationError(
-                        _('Errors occurred during assignment'))
-        except ValidationError as error:
-            # Display errors and show form again if rollback occured
-            messages.error(self.request, error.messages[0])
+        assignments = [
+            StudentGroupAssignment(student=student, **kwargs)
+            for student in students_to_add
+        ]
+        # skip students with collisions if user selected such option,
+        # otherwise nothing is saved if any error occurs
+        unsafe_add = 'unsafe_add' in self.request.POST
+        created, errors = bulk_create_assignments(
+            assignments, skip_invalid=unsafe_add)
+        count = len(created)
+        errors = [error for _, error in sorted(errors.items())]
+        if errors and not unsafe_add:
+            # Display errors and show form again
+            form.add_error(None, errors)
+            messages.error(
+                self.request, _('Errors occurred during assignment'))
             return self.form_invalid(form)
 
         if errors:
@@ -322,6 +319,68 @@ class CourseUpdateView(PermissionRequiredMixin, SuccessMessageMixin,
         })
 
 
+class CourseRegisterView(PermissionRequiredMixin, DetailView):
+    """
+    View showing attendance of course's students in all course's lessons,
+    optionally limited to dates range provided as GET params.
+    Need 'records.view_course' and 'records.view_attendance' permissions.
+    """
+    permission_required = ['records.view_course', 'records.view_attendance']
+    model = Course
+    queryset = Course.objects.select_related('group')
+    template_name = 'records/group/course_register.html'
+    context_object_name = 'course'
+
+    def get_context_data(self, **kwargs):
+        form = DateRangeForm(self.request.GET or None)
+        dates = form.cleaned_data if form.is_valid() else {}
+        kwargs.update({
+            'group': self.object.group,
+            'form': form,
+            'register': get_course_register(
+                self.object,
+                date_from=dates.get('date_from'),
+                date_to=dates.get('date_to'),
+            ),
+        })
+        return super().get_context_data(**kwargs)
+
+
+class CourseGradebookView(PermissionRequiredMixin, DetailView):
+    """
+    View showing marks of course's students by category, with students'
+    and categories' statistics.
+    Need 'records.view_course' and 'records.view_mark' permissions.
+    """
+    permission_required = ['records.view_course', 'records.view_mark']
+    model = Course
+    queryset = Course.objects.select_related('group')
+    template_name = 'records/group/course_gradebook.html'
+    context_object_name = 'course'
+
+    def get_context_data(self, **kwargs):
+        kwargs.update({
+            'group': self.object.group,
+            'gradebook': get_course_gradebook(self.object),
+        })
+        return super().get_context_data(**kwargs)
+
+
+class CourseGradebookExportView(CourseGradebookView):
+    """ Course's gradebook as CSV file """
+
+    def get(self, request, *args, **kwargs):
+        self.object = self.get_object()
+        gradebook = get_course_gradebook(self.object)
+        response = HttpResponse(
+            ''.join(iter_gradebook_csv(gradebook)),
+            content_type='text/csv'
+        )
+        response['Content-Disposition'] = \
+            'attachment; filename="gradebook_%s.csv"' % self.object.pk
+        return response
+
+
 class GroupScheduleView(GroupTimetableView):
     """
     View selected group's schedule
@@ -5,12 +5,12 @@ from django.contrib.auth.mixins import (
 from django.contrib.messages.views import SuccessMessageMixin
 from django.utils.translation import gettext_lazy as _
 from django.contrib import messages
-from records.models import Lesson, Attendance, Mark, User
+from records.models import Lesson, Attendance, User
 from records.forms import attendance as attendance_forms
 from records.forms import mark as mark_forms
-from records.views.mixins import PrevURLMixin
+from records.views.mixins import PrevURLMixin, KeysetPaginationMixin
+from records.utils.mark import get_grade_sheet
 import datetime
-from collections import OrderedDict
 
 
 class LessonUpdateView(PermissionRequiredMixin, UserPassesTestMixin,
@@ -45,9 +45,13 @@ class LessonUpdateView(PermissionRequiredMixin, UserPassesTestMixin,
 
     def get_formset(self):
         """ Returns formset to check students' attendance """
+        # ordered by student only - default ordering joins Lesson too
         kwargs = {
             'prefix': 'attendances',
-            'queryset': Attendance.objects.filter(lesson=self.object)
+            'queryset': Attendance.objects
+            .filter(lesson=self.object)
+            .select_related('student')
+            .order_by('student__last_name', 'student__first_name', 'pk')
         }
         if self.request.method in ('POST', 'PUT') and \
                 'restore_lesson' not in self.request.POST:
@@ -164,19 +168,7 @@ class LessonMarksView(PermissionRequiredMixin, UserPassesTestMixin,
         return qs
 
     def _get_marks(self):
-        students = OrderedDict()
-        course = self.object.schedule.course
-        for attendance in self.object.attendances.all():
-            absent = (attendance.status == Attendance.STATUS_ABSENT)
-            marks = Mark.objects.filter(
-                student=attendance.student,
-                course=course
-            ).select_related('symbol')
-            students[attendance.student] = {
-                'marks': list(marks),
-                'absent': absent
-            }
-        return students
+        return get_grade_sheet(self.object)
 
     def _get_mark_create_form(self):
         initial = {
@@ -201,14 +193,17 @@ class LessonMarksView(PermissionRequiredMixin, UserPassesTestMixin,
         return context
 
 
-class AllLessonsListView(PermissionRequiredMixin, ListView):
+class AllLessonsListView(PermissionRequiredMixin, KeysetPaginationMixin,
+                         ListView):
     """
     List view with prefetched teacher, course, group etc. and filtered
-    for current user.
+    for current user. Paginated by cursor, without counting all lessons.
     """
     permission_required = ['records.view_lesson']
     model = Lesson
     paginate_by = 20
+    keyset = ('-date', '-pk')
+    paginate_count = False
     context_object_name = 'lessons'
 
     def get_queryset(self):
@@ -1,3 +1,8 @@
+from django.http import Http404
+from django.utils.translation import gettext_lazy as _
+from records.utils.pagination import KeysetPaginator, InvalidCursor
+
+
 class PrevURLMixin:
     """
     Gets previous site url from GET parameters and adds to context data
@@ -13,3 +18,28 @@ class PrevURLMixin:
         if self.prev_url:
             kwargs['prev'] = self.prev_url
         return super().get_context_data(**kwargs)
+
+
+class KeysetPaginationMixin:
+    """
+    Replace ListView's page number pagination with cursor based one
+    (see utils.pagination.KeysetPaginator), so deep pages load as fast as
+    first one. Pages are selected with 'after' or 'before' GET params.
+    'keyset' has to match ordering of the list and end with unique field.
+    Set 'paginate_count' to False to skip counting all objects.
+    Use with 'includes/keyset_pagination.html' template.
+    """
+    keyset = ('pk',)
+    paginate_count = True
+
+    def paginate_queryset(self, queryset, page_size):
+        paginator = KeysetPaginator(
+            queryset, page_size, self.keyset, self.paginate_count)
+        try:
+            page = paginator.get_page(
+                after=self.request.GET.get('after'),
+                before=self.request.GET.get('before'),
+            )
+        except InvalidCursor:
+            raise Http404(_('Invalid page cursor.'))
+        return (paginator, page, page.object_list, page.has_other_pages())
@@ -12,7 +12,9 @@ from django.utils.translation import gettext_lazy as _
 from records.models import Schedule, User, StudentGroup
 from records.forms import schedule as schedule_forms
 from records.utils.dates import get_week_dates, get_weekday_names
-from records.utils.schedule import get_group_timetable, get_teacher_timetable
+from records.utils.schedule import (
+    get_cached_group_timetable, get_cached_teacher_timetable
+)
 from records.views.mixins import PrevURLMixin
 from datetime import datetime
 
@@ -74,7 +76,7 @@ class TeacherTimetableView(PermissionRequiredMixin, TimetableView):
             }
 
     def get_timetable(self, dates):
-        return get_teacher_timetable(
+        return get_cached_teacher_timetable(
             dates, self.timetable_kwargs['teacher']
         )
 
@@ -108,7 +110,7 @@ class GroupTimetableView(PermissionRequiredMixin, TimetableView):
             }
 
     def get_timetable(self, dates):
-        return get_group_timetable(
+        return get_cached_group_timetable(
             dates, self.timetable_kwargs['group']
         )
 
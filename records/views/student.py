@@ -1,19 +1,28 @@
-from django.views.generic import CreateView, DetailView, ListView, UpdateView
+from django.views.generic import (
+    CreateView, DetailView, FormView, ListView, UpdateView
+)
 from django.contrib.auth.mixins import PermissionRequiredMixin
 from django.contrib.messages.views import SuccessMessageMixin
+from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.urls import reverse_lazy
 from django.utils.translation import gettext_lazy as _
 from django.db.models import When, Case, Value
 from django.shortcuts import get_object_or_404
-from records.forms.student import StudentCreateForm, AssignToGroupForm
-from records.models import StudentGroupAssignment, Mark
+from records.forms.student import (
+    StudentCreateForm, AssignToGroupForm, StudentImportForm
+)
+from records.models import StudentGroupAssignment, Mark, MarkAggregate
+from records.utils.user import prefetch_current_assignments
+from records.utils.student_import import import_students, split_duplicates
+from records.views.mixins import KeysetPaginationMixin
 import datetime
 
 User = get_user_model()
 
 
-class StudentListView(PermissionRequiredMixin, ListView):
+class StudentListView(PermissionRequiredMixin, KeysetPaginationMixin,
+                      ListView):
     """
     View to show list of students.
     Need 'records.view_student' permission to access.
@@ -22,9 +31,16 @@ class StudentListView(PermissionRequiredMixin, ListView):
     model = User
     template_name = 'records/student/student_list.html'
     paginate_by = 20
+    keyset = ('last_name', 'first_name', 'pk')
     context_object_name = 'students'
     queryset = User.objects.filter(is_teacher=False)
 
+    def get_context_data(self, **kwargs):
+        """ Resolve current groups of whole page with one query """
+        context = super().get_context_data(**kwargs)
+        prefetch_current_assignments(context['students'])
+        return context
+
 
 class StudentDetailView(PermissionRequiredMixin, DetailView):
     """
@@ -93,6 +109,36 @@ class StudentCreateView(PermissionRequiredMixin, SuccessMessageMixin,
         return super().get_success_url()
 
 
+class StudentImportView(PermissionRequiredMixin, FormView):
+    """
+    View to create many student accounts from uploaded CSV file.
+    Need 'records.add_student' permission to access.
+    Students already existing are skipped. Generated credentials are
+    shown once, on printable sheet rendered instead of redirect.
+    """
+    permission_required = ['records.add_student']
+    form_class = StudentImportForm
+    template_name = 'records/student/student_import.html'
+    credentials_template_name = \
+        'records/student/student_import_credentials.html'
+
+    def form_valid(self, form):
+        students, duplicates = split_duplicates(form.students)
+        credentials = import_students(
+            [student for _, student in students],
+            workers=settings.STUDENT_IMPORT_WORKERS)
+        return self.response_class(
+            request=self.request,
+            template=[self.credentials_template_name],
+            context=self.get_context_data(
+                credentials=credentials,
+                duplicates=duplicates,
+                row_errors=form.row_errors,
+            ),
+            using=self.template_engine,
+        )
+
+
 class StudentUpdateView(PermissionRequiredMixin, SuccessMessageMixin,
                         UpdateView):
     """
@@ -201,11 +247,23 @@ class StudentMarksView(PermissionRequiredMixin, DetailView):
     queryset = User.objects.filter(is_teacher=False)
 
     def get_marks(self):
-        qs = Mark.objects\
-            .filter(student=self.object)\
-            .order_by('course__group', 'course__name', 'date_created')\
-            .select_related('symbol', 'course')
-        return qs
+        """
+        Return list of student's marks. Course's summary (count and mean)
+        is read from student's MarkAggregates with one query and set as
+        'aggregate' attribute of marks' courses.
+        """
+        marks = list(Mark.objects
+                     .filter(student=self.object)
+                     .order_by('course__group', 'course__name',
+                               'date_created')
+                     .select_related('symbol', 'course', 'course__group'))
+        aggregates = {
+            aggregate.course_id: aggregate
+            for aggregate in MarkAggregate.objects.filter(student=self.object)
+        }
+        for mark in marks:
+            mark.course.aggregate = aggregates.get(mark.course_id)
+        return marks
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
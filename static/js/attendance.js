@@ -0,0 +1,51 @@
+// save student's attendance right after click (see AttendanceSetView),
+// instead of sending whole lesson form
+let attendanceTimers = {};
+let attendanceSeq = {};
+let attendanceCsrfToken = $("[name=csrfmiddlewaretoken]").val();
+
+function saveAttendance(row, status) {
+  let url = row.data("url");
+  // next number after the last saved one, so server can drop requests
+  // arriving late or sent from outdated page
+  let seq = row.data("seq") + 1;
+  row.data("seq", seq);
+  attendanceSeq[url] = seq;
+  $.ajax({
+    type: "POST",
+    url: url,
+    headers: { "X-CSRFToken": attendanceCsrfToken },
+    data: { status: status, seq: seq },
+    success: function (data) {
+      row.data("seq", Math.max(row.data("seq"), data.seq));
+      if (attendanceSeq[url] != seq) {
+        return;
+      }
+      if (data.stale) {
+        // status was changed elsewhere - show the saved one
+        row
+          .find("input[type=radio][value=" + data.status + "]")
+          .prop("checked", true);
+      }
+      row.removeClass("attendance-saving attendance-error");
+    },
+    error: function () {
+      row.removeClass("attendance-saving").addClass("attendance-error");
+    },
+  });
+}
+
+$(".attendance-row input[type=radio]").change(function () {
+  let row = $(this).closest(".attendance-row");
+  let url = row.data("url");
+  if (!url) {
+    return;
+  }
+  let status = $(this).val();
+  row.addClass("attendance-saving");
+  // wait for next clicks in the same row, send only the last status
+  clearTimeout(attendanceTimers[url]);
+  attendanceTimers[url] = setTimeout(function () {
+    saveAttendance(row, status);
+  }, 300);
+});
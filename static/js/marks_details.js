@@ -16,6 +16,10 @@ function handleChangeErrors(response) {
   // for every error, find related input and error message under it
   $.each(errors, function (key, val) {
     let field = $("#id_change-" + key);
+    // show non-field errors (e.g. concurrent change) under symbol field
+    if (!field.length) {
+      field = $("#id_change-symbol");
+    }
     let message = val[0].message;
     console.log(val);
     let container = $('<div class="alert alert-danger mt-2"></div>');